@@ -30,11 +30,20 @@ This capability is crucial in identifying and rectifying potential projection is
 The most important step in this tool in relation to the fireline engagement metrics workflow is the duplicate shape analysis which can identify perimeters that have different attribution for the same shape and location.
 """
 # Import necessary libraries
-import arcpy, os, urllib, sys, requests, traceback
-from zipfile import ZipFile
+# The download (requests, zipfile) and metadata libraries are imported where they are used so runs on user input data do not load them
+import arcpy, atexit, os, re, sys, traceback
 from sys import argv
 from datetime import datetime, timezone
-from arcpy import metadata as md
+from hashlib import blake2b
+import numpy as np
+import pandas as pd
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+# shapely is not part of the default ArcGIS Pro environment. When it is installed the identical shape search uses a shapely STRtree, otherwise the Find Identical tool is used.
+try:
+    import shapely
+except ImportError:
+    shapely = None
 # Define input parameters for the geoprocessing tool
 DownloadTrigger = arcpy.GetParameterAsText(0) # Boolean: Determines whether to download data, default is "false" #Required
 DownloadSelection = arcpy.GetParameterAsText(1) # Boolean: Determines which dataset to download, default is "false" #Required
@@ -49,7 +58,7 @@ if not FireYear:
 FieldFireName = arcpy.GetParameterAsText(5) # String: Field name for filtering data, default is "attr_IncidentName" #Required
 # If FieldFireName is not provided, set a default value
 if not FieldFireName:
-    userinputinvalidnametext = "attr_IncidentName"
+    FieldFireName = "attr_IncidentName"
 userinputinvalidnametext = arcpy.GetParameterAsText(6) # String: Used in SQL query, default is "jjjjjjjj" #Optional
 # If userinputinvalidnametext is not provided, set a default value
 if not userinputinvalidnametext:
@@ -59,9 +68,8 @@ Identicalshapetolerance = arcpy.GetParameterAsText(7) # Double: Tolerance for id
 if not Identicalshapetolerance:
     Identicalshapetolerance = 25
 VtxCntTrigger = arcpy.GetParameterAsText(8)# Boolean: Determines whether to count vertices, default is "false" #Optional
-# Set VerticesCount and UserIntersectTrigger based on VtxCntTrigger
-if VtxCntTrigger == "true":
-    VerticesCount = 4
+# Set VerticesCount based on VtxCntTrigger (None when vertices are not counted) and the UserIntersectTrigger default
+VerticesCount = 4 if VtxCntTrigger == "true" else None
 UserIntersectTrigger = "false"
 
 ###-Variables-###
@@ -70,87 +78,48 @@ try:
     dt = datetime.now()
     datetime = dt.strftime("%Y%m%d_%H%M")
     #PC Directory
-    scrptfolder = os.path.dirname(__file__) #Returns the UNC of the folder where this python file sits
-    folder_lst = os.path.split(scrptfolder) #make a list of the head and tail of the scripts folder
-    local_root_fld = folder_lst[0] #Access the head (full directory) where the scripts folder resides
-    webdwnld_fgdb = os.path.join(local_root_fld,"Output","Output.gdb")
-    scratchworkspace = os.path.join(local_root_fld,"ScratchWorkspace","scratch.gdb")
-    scratchfolder = os.path.join(local_root_fld,"ScratchWorkspace")
+    local_root_fld = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) #The full directory where the scripts folder resides
     localoutputws = os.path.join(local_root_fld,"Output","Output.gdb")
+    webdwnld_fgdb = localoutputws
+    scratchfolder = os.path.join(local_root_fld,"ScratchWorkspace")
+    scratchworkspace = os.path.join(scratchfolder,"scratch.gdb")
     rawdatastoragegdb = os.path.join(local_root_fld,"NIFC_DL_RawDataArchive","RawDLArchive.gdb")
     #Input for metadata to attribute to output
     QAQCsourcemetadatapath = os.path.join(local_root_fld,"Metadata","Perimeters_QAQC.xml")
     #Input for outside of USA perimeters
-    #USA5kmBuffer = os.path.join(scratchworkspace,"USA5kmBuffer")
+    USA5kmBuffer = os.path.join(scratchworkspace,"USA5kmBuffer")
     #NIFC NIFS URLS. These may change so please manually update these as needed.
     RDA_FirePerimeterHistURL = "https://opendata.arcgis.com/api/v3/datasets/e02b85c0ea784ce7bd8add7ae3d293d0_0/downloads/data?format=shp&spatialRefId=4326&where=1%3D1" #This URL is for the Wildland Fire Management Research, Development, and Application team's Interagency fire perimeter historical dataset
     nifc_pbl_fullhistory_url = "https://opendata.arcgis.com/api/v3/datasets/5e72b1699bf74eefb3f3aff6f4ba5511_0/downloads/data?format=fgdb&spatialRefId=4326&where=1%3D1"   #the URL address of the Historic WFIGS Wildland Fire Perims
     nifc_pbl_YTD_url = "https://opendata.arcgis.com/api/v3/datasets/7c81ab78d8464e5c9771e49b64e834e9_0/downloads/data?format=fgdb&spatialRefId=4326"   #the URL address of the 2024 To Date WFIGS Wildland Fire Perims
 
     #Output Names - Conditionally Set
-    #If user wants to use their own dataset these are the variables it will use
-    if DownloadTrigger == "false":
-        rawdata = (os.path.join(rawdatastoragegdb,"Raw_UserInput"+datetime))
-        All_Dups_Datetime= UserInputTextName+"_AllDupls_"+datetime+"_"+str(Identicalshapetolerance)+"MetersXYTolerance"
-        DuplicatedAcreageTable = UserInputTextName+"_Dupl_Acrg_"+datetime+"_"+str(Identicalshapetolerance)+"MetersXYTolerance"
-        DuplicatedAcreage = UserInputTextName+"_TotalDuplAcreage_"+datetime+"_"+str(Identicalshapetolerance)+"MetersXYTolerance"
-        UserDupsStats = UserInputTextName+"_UserIntersect_DuplAcreage_"+datetime+"_"+str(Identicalshapetolerance)+"MetersXYTolerance"
-        UserDups = UserInputTextName+"_UserIntersect_Dupls_"+datetime+"_"+str(Identicalshapetolerance)+"MetersXYTolerance"
-        InvldNameOutput = UserInputTextName+"_InvalidName_"+datetime
-        IRWIN_ID_Field_Dups = UserInputTextName+"_IRWINID_Duplicates_"+datetime
-        PreDissAcreageTable = UserInputTextName+"_TtlAcrg_"+datetime
-        if VtxCntTrigger == "true":
-            vtxoutput = UserInputTextName+"_VerticiesCountOutput_"+datetime+"_"+str(VerticesCount)+"VrtcNum"
-        final_arch_fc_nm = UserInputTextName+"_UserInputFirePerimeters_"+datetime
-    #If user wants to use the NIFC Full History dataset these are the variables it will use
+    #Name prefixes for each downloadable dataset: (output name prefix, raw data archive prefix). User provided data uses the user input name.
+    DownloadPrefixes = {
+        "Wildland Fire Perimeters (WFIGS) Full History": ("NIFC_WFIGS_FullHistory", "Raw_WFIGS_FullHist_"),
+        "2024 Wildland Fire Perimeters (WFIGS) to Date": ("NIFC_WFIGS_2024ToDate", "Raw_WFIGS2024_ToDate_"),
+        "RDA Team Interagency Fire Perimeter Historical Dataset": ("RDA_Hist", "Raw_RDAFirePerimsHist_"),
+    }
+    OutputPrefix, RawPrefix = DownloadPrefixes.get(DownloadSelection, (UserInputTextName, "Raw_UserInput"))
+    rawdata = os.path.join(rawdatastoragegdb,RawPrefix+datetime)
+    InvldNameOutput = OutputPrefix+"_InvalidName_"+datetime
+    if VtxCntTrigger == "true":
+        vtxoutput = OutputPrefix+"_VerticiesCountOutput_"+datetime+"_"+str(VerticesCount)+"VrtcNum"
+    #The final feature class name also records the calendar year subset for the full history datasets
     if DownloadSelection == "Wildland Fire Perimeters (WFIGS) Full History":
-        rawdata = (os.path.join(rawdatastoragegdb,"Raw_WFIGS_FullHist_"+datetime))
-        All_Dups_Datetime= "NIFC_WFIGS_FullHistory_AllDupls_"+datetime+"_"+str(Identicalshapetolerance)+"MetersXYTolerance"
-        DuplicatedAcreageTable = "NIFC_WFIGS_FullHistory_Dupl_Acrg_"+datetime+"_"+str(Identicalshapetolerance)+"MetersXYTolerance"
-        DuplicatedAcreage = "NIFC_WFIGS_FullHistory_TotalDuplAcreage_"+datetime+"_"+str(Identicalshapetolerance)+"MetersXYTolerance"
-        UserDupsStats = "NIFC_WFIGS_FullHistory_Intersect_DuplAcreage_"+datetime+"_"+str(Identicalshapetolerance)+"MetersXYTolerance"
-        UserDups = "NIFC_WFIGS_FullHistory_Intersect_Dups_"+datetime+"_"+str(Identicalshapetolerance)+"MetersXYTolerance"
-        InvldNameOutput = "NIFC_WFIGS_FullHistory_InvalidName_"+datetime
-        IRWIN_ID_Field_Dups = "NIFC_WFIGS_FullHistory_IRWINID_Duplicates_"+datetime
-        PreDissAcreageTable = "NIFC_WFIGS_FullHistory_TtlAcrg_"+datetime
-        if VtxCntTrigger == "true":
-            vtxoutput = "NIFC_WFIGS_FullHistory_VerticiesCountOutput_"+datetime+"_"+str(VerticesCount)+"VrtcNum"
-        final_arch_fc_nm = "NIFC_WFIGS_FullHistory_QAQC_"+datetime
         if FireYear is not None:
-            final_arch_fc_nm = "NIFC_WFIGS_FullHistory_CY"+FireYear+"_QAQC_"+datetime
-        if FireYear == None:
-            final_arch_fc_nm = "NIFC_WFIGS_FullHistory_QAQC_"+datetime
-    #If user wants to use the NIFC 2024 YTD dataset these are the variables it will use
-    if DownloadSelection == "2024 Wildland Fire Perimeters (WFIGS) to Date":
-        rawdata = (os.path.join(rawdatastoragegdb,"Raw_WFIGS2024_ToDate_"+datetime))
-        All_Dups_Datetime= "NIFC_WFIGS_2024ToDate_AllDupls_"+datetime+"_"+str(Identicalshapetolerance)+"MetersXYTolerance"
-        DuplicatedAcreageTable = "NIFC_WFIGS_2024ToDate_Dupl_Acrg_"+datetime+"_"+str(Identicalshapetolerance)+"MetersXYTolerance"
-        DuplicatedAcreage = "NIFC_WFIGS_2024ToDate_TotalDuplAcreage_"+datetime+"_"+str(Identicalshapetolerance)+"MetersXYTolerance"
-        UserDupsStats = "NIFC_WFIGS_2024ToDate_Intersect_DuplAcreage_"+datetime+"_"+str(Identicalshapetolerance)+"MetersXYTolerance"
-        UserDups = "NIFC_WFIGS_2024ToDate_Intersect_Dups_"+datetime+"_"+str(Identicalshapetolerance)+"MetersXYTolerance"
-        InvldNameOutput = "NIFC_WFIGS_2024ToDate_InvalidName_"+datetime
-        IRWIN_ID_Field_Dups = "NIFC_WFIGS_2024ToDate_IRWINID_Duplicates_"+datetime
-        PreDissAcreageTable = "NIFC_WFIGS_2024ToDate_TtlAcrg_"+datetime
-        if VtxCntTrigger == "true":
-            vtxoutput = "NIFC_WFIGS_2024ToDate_VerticiesCountOutput_"+datetime+"_"+str(VerticesCount)+"VrtcNum"
-        final_arch_fc_nm = "NIFC_WFIGS_2024ToDate_QAQC_"+datetime
-    #If user wants to use the Wildland Fire Management Research, Development, and Application team's Interagency fire perimeter historical dataset
-    if DownloadSelection == "RDA Team Interagency Fire Perimeter Historical Dataset":
-        rawdata = (os.path.join(rawdatastoragegdb,"Raw_RDAFirePerimsHist_"+datetime))
-        All_Dups_Datetime= "RDA_Hist_AllDupls_"+datetime+"_"+str(Identicalshapetolerance)+"MetersXYTolerance"
-        DuplicatedAcreageTable = "RDA_Hist_Dupl_Acrg_"+datetime+"_"+str(Identicalshapetolerance)+"MetersXYTolerance"
-        DuplicatedAcreage = "RDA_Hist_TotalDuplAcreage_"+datetime+"_"+str(Identicalshapetolerance)+"MetersXYTolerance"
-        UserDupsStats = "RDA_Hist_Intersect_DuplAcreage_"+datetime+"_"+str(Identicalshapetolerance)+"MetersXYTolerance"
-        UserDups = "RDA_Hist_Intersect_Dups_"+datetime+"_"+str(Identicalshapetolerance)+"MetersXYTolerance"
-        InvldNameOutput = "RDA_Hist_InvalidName_"+datetime
-        IRWIN_ID_Field_Dups = "RDA_Hist_IRWINID_Duplicates_"+datetime
-        PreDissAcreageTable = "RDA_Hist_TtlAcrg_"+datetime
+            final_arch_fc_nm = OutputPrefix+"_CY"+FireYear+"_QAQC_"+datetime
+        else:
+            final_arch_fc_nm = OutputPrefix+"_QAQC_"+datetime
+    elif DownloadSelection == "2024 Wildland Fire Perimeters (WFIGS) to Date":
+        final_arch_fc_nm = OutputPrefix+"_QAQC_"+datetime
+    elif DownloadSelection == "RDA Team Interagency Fire Perimeter Historical Dataset":
         if FireYear is not None:
             final_arch_fc_nm = "NIFC_RDA_Perims_CY"+FireYear+"_QAQC_"+datetime
-        if FireYear == None:
+        else:
             final_arch_fc_nm = "NIFC_RDA_Perims_AllHist_QAQC_"+datetime
-        if VtxCntTrigger == "true":    
-            vtxoutput = "NIFC_RDA_VerticiesCountOutput_"+datetime+"_"+str(VerticesCount)+"VrtcNum"
+    else:
+        final_arch_fc_nm = OutputPrefix+"_UserInputFirePerimeters_"+datetime
 except:
     arcpy.AddError("Variables could not be set. Exiting...")
     print("Variables could not be set. Exiting...")
@@ -164,6 +133,10 @@ try:
     # Environment settings
     arcpy.env.scratchWorkspace = scratchworkspace
     arcpy.env.workspace = localoutputws
+    # Stop logging geoprocessing history while the QAQC runs so every tool call does not write a log entry. The user's setting is restored when the script ends.
+    loghistory = arcpy.GetLogHistory()
+    arcpy.SetLogHistory(False)
+    atexit.register(arcpy.SetLogHistory, loghistory)
 except:
     arcpy.AddError("Evironments could not be set. Exiting...")
     print("Evironments could not be set. Exiting...")
@@ -185,11 +158,98 @@ def report_error():
     print(pymsg)
     print(msgs)    
 
+#Function to count the rows of a table, feature class, or layer with a data access cursor instead of the Get Count tool
+def fastcount(in_table, where_clause=None):
+    with arcpy.da.SearchCursor(in_table, ["OID@"], where_clause) as cursor:
+        return sum(1 for _ in cursor)
+
+#Function to find shapes with byte for byte identical geometry by hashing their WKB. Returns a dictionary of {OBJECTID: sequence number} like find_identical_shapes.
+def find_exact_shapes(in_fc):
+    groups = {}
+    with arcpy.da.SearchCursor(in_fc, ["OID@", "SHAPE@WKB"]) as cursor:
+        for row in cursor:
+            wkb = bytes(row[1])
+            #When shapely is installed the shape is normalized first so copies that start at a different vertex hash the same
+            if shapely is not None:
+                wkb = shapely.to_wkb(shapely.normalize(shapely.from_wkb(wkb)))
+            groups.setdefault(blake2b(wkb, digest_size=16).digest(), []).append(row[0])
+    identicals = {}
+    feat_seq = 0
+    for members in groups.values():
+        if len(members) > 1:
+            feat_seq = feat_seq+1
+            for oid in members:
+                identicals[oid] = feat_seq
+    return identicals
+
+#Function to find identical shapes with a shapely STRtree. Returns a dictionary of {OBJECTID: sequence number} for every feature that has a duplicate, like the Find Identical tool output (IN_FID, FEAT_SEQ)
+def find_identical_shapes(in_fc,xy_tolerance):
+    #Geometries are read projected to NAD83 CONUS Albers so the XY tolerance can be applied in meters. Albers distances are only true near
+    #the lower 48 standard parallels, so in Alaska and Hawaii the tolerance covers a shorter or longer ground distance than the one entered.
+    oids = []
+    geoms = []
+    with arcpy.da.SearchCursor(in_fc, ["OID@", "SHAPE@WKB"], spatial_reference=arcpy.SpatialReference(5070)) as cursor:
+        for row in cursor:
+            oids.append(row[0])
+            geoms.append(shapely.from_wkb(bytes(row[1])))
+    #Normalize the geometries so shapes that only differ in their starting vertex or ring order still compare as identical
+    geoms = shapely.normalize(np.array(geoms, dtype=object))
+    #Candidate pairs are features whose extents are within the tolerance of each other
+    tree = shapely.STRtree(geoms)
+    left, right = tree.query(shapely.buffer(shapely.envelope(geoms), xy_tolerance, join_style="mitre"))
+    keep = left < right
+    left = left[keep]
+    right = right[keep]
+    identical = shapely.equals_exact(geoms[left], geoms[right], tolerance=xy_tolerance)
+    #Group the identical pairs as connected components so every feature in a set of duplicates gets the same sequence number
+    pairs = coo_matrix((np.ones(np.count_nonzero(identical)), (left[identical], right[identical])), shape=(len(oids), len(oids)))
+    labels = connected_components(pairs, directed=False)[1]
+    duplicated = np.bincount(labels)[labels] > 1
+    feat_seq = np.unique(labels[duplicated], return_inverse=True)[1]+1
+    return dict(zip(np.asarray(oids)[duplicated].tolist(), feat_seq.tolist()))
+
+#Function to find the features that do not intersect a boundary feature class with an STRtree queried by the prepared shapely boundary. Returns a set of OBJECTIDs.
+def find_outside_features(in_fc,boundary_fc):
+    #Perimeters are read in the spatial reference of the boundary
+    boundary_sr = arcpy.Describe(boundary_fc).spatialReference
+    with arcpy.da.SearchCursor(boundary_fc, ["SHAPE@WKB"]) as cursor:
+        boundary = shapely.union_all([shapely.from_wkb(bytes(row[0])) for row in cursor])
+    shapely.prepare(boundary)
+    oids = []
+    geoms = []
+    with arcpy.da.SearchCursor(in_fc, ["OID@", "SHAPE@WKB"], spatial_reference=boundary_sr) as cursor:
+        for row in cursor:
+            oids.append(row[0])
+            geoms.append(shapely.from_wkb(bytes(row[1])))
+    tree = shapely.STRtree(geoms)
+    inside = tree.query(boundary, predicate="intersects")
+    return set(oids) - set(oids[i] for i in inside)
+
+#HTTP session shared by all downloads so the connection to the NIFC servers is reused. Dropped connections and server errors are retried with a backoff.
+#The session is created by the first download.
+http_session = None
+def download_session():
+    global http_session
+    if http_session is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+        http_session = requests.Session()
+        http_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=4, max_retries=Retry(total=3, backoff_factor=1, status_forcelist=[500, 502, 503, 504])))
+    return http_session
+
 #Function to download zipfile, unzip, create a filtered feature class, and delete intermin data
-def dwnld_unzip_filter(url_addrs,tozip,dwnld_fcnm,fnl_fgdb):
-    #Download the Wildfire Perimeters off the web
+def dwnld_unzip_filter(url_addrs,tozip,dwnld_fcnm,fnl_fgdb,fnl_fcnm="Perimeters",session=None):
+    from zipfile import ZipFile
+    #Download the Wildfire Perimeters off the web. The zip is streamed to disk in 8 MB chunks rather than held in memory.
     try:
-        urllib.request.urlretrieve(url_addrs,tozip)  #This is unique to python 3... will not work if run from ArcGIS Desktop
+        if session is None:
+            session = download_session()
+        with session.get(url_addrs, stream=True, timeout=60) as response:
+            response.raise_for_status()
+            with open(tozip, "wb") as zipout:
+                for chunk in response.iter_content(chunk_size=8*1024*1024):
+                    zipout.write(chunk)
     except:
         arcpy.AddWarning("Could not retrieve file from web URL address: "+url_addrs)
         print("Could not retrieve file from web URL address: "+url_addrs)
@@ -197,16 +257,20 @@ def dwnld_unzip_filter(url_addrs,tozip,dwnld_fcnm,fnl_fgdb):
     #Unzip the fgdb, grab the fgdb name, and feature class name
     try:
         arcpy.AddMessage("...UnZipping file: "+tozip)
-        zipA = ZipFile(tozip)
-        nm_list = zipA.namelist()
-        zipA.extractall(scratchfolder)
-        nifs_fp_fgdbnm = os.path.dirname(nm_list[0]) #this gets the 'directory name' of the first item in the list of files within the zipfile. The fgdb name.
+        with ZipFile(tozip) as zipA:
+            nm_list = zipA.namelist()
+            nifs_fp_fgdbnm = os.path.dirname(nm_list[0]) #this gets the 'directory name' of the first item in the list of files within the zipfile. The fgdb name.
+            #Only extract the members of the fgdb. Zips with files at the root (the RDA shapefile) are extracted in full.
+            if nifs_fp_fgdbnm:
+                members = [nm for nm in nm_list if nm.startswith(nifs_fp_fgdbnm+"/")]
+            else:
+                members = None
+            zipA.extractall(scratchfolder, members)
         nifs_fp_fcnm = os.path.join(scratchfolder,nifs_fp_fgdbnm,dwnld_fcnm)
         if DownloadSelection == "RDA Team Interagency Fire Perimeter Historical Dataset":
-            arcpy.conversion.ExportFeatures((os.path.join(scratchfolder,"InterAgencyFirePerimeterHistory_All_Years_View")),(os.path.join(fnl_fgdb,"Perimeters")))
+            arcpy.conversion.ExportFeatures((os.path.join(scratchfolder,"InterAgencyFirePerimeterHistory_All_Years_View")),(os.path.join(fnl_fgdb,fnl_fcnm)))
         else:
-            arcpy.FeatureClassToFeatureClass_conversion(nifs_fp_fcnm,fnl_fgdb,"Perimeters")
-        zipA.close()
+            arcpy.FeatureClassToFeatureClass_conversion(nifs_fp_fcnm,fnl_fgdb,fnl_fcnm)
     except:
         arcpy.AddWarning("Could not unzip downloaded perimeters dataset.")
         print("Could not unzip downloaded perimeters dataset.")
@@ -217,7 +281,6 @@ def dwnld_unzip_filter(url_addrs,tozip,dwnld_fcnm,fnl_fgdb):
         os.remove(tozip)   #deleting the zip file itself
         if DownloadSelection == "RDA Team Interagency Fire Perimeter Historical Dataset":
             arcpy.management.Delete(os.path.join(scratchworkspace,"InterAgencyFirePerimeterHistory_All_Years_View.shp"))
-            arcpy.management.Delete(tozip)
         else:
             arcpy.Delete_management(os.path.join(scratchfolder,nifs_fp_fgdbnm)) #deleting the fgdb unzipped into the scratch folder
     except:
@@ -234,11 +297,12 @@ if DownloadSelection == "Wildland Fire Perimeters (WFIGS) Full History":
         print("Downloading Wildland Fire Perimeters (WFIGS) Full History...")
         arcpy.AddMessage("Downloading Wildland Fire Perimeters (WFIGS) Full History")
         temparchzip = os.path.join(scratchfolder,"NIFC_Public_WildlandFirePerims_Historical_gdb_"+datetime+".zip")
-        dwnld_unzip_filter(nifc_pbl_fullhistory_url,temparchzip,"Perimeters",webdwnld_fgdb)
-        user_fire_perimeters = os.path.join(webdwnld_fgdb,"Perimeters")
+        #Extract straight into the raw data archive so the download does not need to be copied there again
+        dwnld_unzip_filter(nifc_pbl_fullhistory_url,temparchzip,"Perimeters",rawdatastoragegdb,os.path.basename(rawdata))
+        user_fire_perimeters = rawdata
         # Announce Completion and final feature class name:
-        arcpy.AddMessage("The downloaded NIFC Public Open Data is located in: "+webdwnld_fgdb)
-        print("The downloaded  NIFC Public Open Data is located in: "+webdwnld_fgdb)
+        arcpy.AddMessage("The downloaded NIFC Public Open Data is located in: "+rawdatastoragegdb)
+        print("The downloaded  NIFC Public Open Data is located in: "+rawdatastoragegdb)
     except:
         arcpy.AddError("Error downloading and unzipping the Wildland Fire Perimeters. Exiting.")
         print("Error downloading and unzipping the Wildland Fire Perimeters. Exiting.")
@@ -250,11 +314,12 @@ if DownloadSelection == "2024 Wildland Fire Perimeters (WFIGS) to Date":
         print("Downloading 2024 Wildland Fire Perimeters (WFIGS) to Date...")
         arcpy.AddMessage("Downloading 2024 Wildland Fire Perimeters (WFIGS) to Date")
         temparchzip = os.path.join(scratchfolder,"NIFC_CY2024_Public_WildlandFirePerims_ToDate_gdb_"+datetime+".zip")
-        dwnld_unzip_filter(nifc_pbl_YTD_url,temparchzip,"Perimeters",webdwnld_fgdb)
-        user_fire_perimeters = os.path.join(webdwnld_fgdb,"Perimeters")
+        #Extract straight into the raw data archive so the download does not need to be copied there again
+        dwnld_unzip_filter(nifc_pbl_YTD_url,temparchzip,"Perimeters",rawdatastoragegdb,os.path.basename(rawdata))
+        user_fire_perimeters = rawdata
         # Announce Completion and final feature class name:
-        arcpy.AddMessage("The downloaded NIFC Public Open Data is located in: "+webdwnld_fgdb)
-        print("The downloaded  NIFC Public Open Data is located in: "+webdwnld_fgdb)
+        arcpy.AddMessage("The downloaded NIFC Public Open Data is located in: "+rawdatastoragegdb)
+        print("The downloaded  NIFC Public Open Data is located in: "+rawdatastoragegdb)
     except:
         arcpy.AddError("Error downloading and unzipping the Wildland Fire Perimeters. Exiting.")
         print("Error downloading and unzipping the Wildland Fire Perimeters. Exiting.")
@@ -266,11 +331,12 @@ if DownloadSelection == "RDA Team Interagency Fire Perimeter Historical Dataset"
         print("Downloading RDA Team's Interagency Fire Perimeter Historical Dataset...")
         arcpy.AddMessage("Downloading RDA Team's Interagency Fire Perimeter Historical Dataset...")
         temparchzip = os.path.join(scratchfolder,"RDA_HistFirePerims_ToDate_gdb_"+datetime+".zip")
-        dwnld_unzip_filter(RDA_FirePerimeterHistURL,temparchzip,"RDA_IntrgncyPerimHistory",webdwnld_fgdb)
-        user_fire_perimeters = os.path.join(webdwnld_fgdb,"Perimeters")
+        #Extract straight into the raw data archive so the download does not need to be copied there again
+        dwnld_unzip_filter(RDA_FirePerimeterHistURL,temparchzip,"RDA_IntrgncyPerimHistory",rawdatastoragegdb,os.path.basename(rawdata))
+        user_fire_perimeters = rawdata
         # Announce Completion and final feature class name:
-        arcpy.AddMessage("The downloaded NIFC RDA Team's Interagency Fire Perimeter Historical Dataset is located in: "+webdwnld_fgdb)
-        print("The downloaded NIFC RDA Team's Interagency Fire Perimeter Historical Dataset is located in: "+webdwnld_fgdb)
+        arcpy.AddMessage("The downloaded NIFC RDA Team's Interagency Fire Perimeter Historical Dataset is located in: "+rawdatastoragegdb)
+        print("The downloaded NIFC RDA Team's Interagency Fire Perimeter Historical Dataset is located in: "+rawdatastoragegdb)
     except:
         arcpy.AddError("Error downloading and unzipping the Wildland Fire Perimeters. Exiting.")
         print("Error downloading and unzipping the Wildland Fire Perimeters. Exiting.")
@@ -279,11 +345,15 @@ if DownloadSelection == "RDA Team Interagency Fire Perimeter Historical Dataset"
     #Format the RDA data to have fields that match that of WFIGS so that it works with the rest of the script
 if DownloadSelection == "RDA Team Interagency Fire Perimeter Historical Dataset":
     try:
-        arcpy.management.ConvertTimeField(user_fire_perimeters,"FIRE_YEAR_","yyyy","attr_FireDiscoveryDateTime","DATE","")
-        arcpy.management.AddField(user_fire_perimeters,"attr_IncidentName","TEXT",None,None,50,"","NULLABLE","NON_REQUIRED","")
-        arcpy.management.CalculateField(user_fire_perimeters,"attr_IncidentName","!INCIDENT!","PYTHON3","","TEXT","NO_ENFORCE_DOMAINS")
-        arcpy.management.AddField(user_fire_perimeters,"attr_IrwinID","TEXT",None,None,38,"","NULLABLE","NON_REQUIRED","")
-        arcpy.management.CalculateField(user_fire_perimeters,"attr_IrwinID","!IRWINID!","PYTHON3","","DATE","NO_ENFORCE_DOMAINS")
+        arcpy.management.AddFields(user_fire_perimeters,[["attr_FireDiscoveryDateTime","DATE"],["attr_IncidentName","TEXT","",50],["attr_IrwinID","TEXT","",38]])
+        # Populate the discovery date (January 1st of the fire year), name, and IRWIN ID fields in a single cursor pass
+        with arcpy.da.UpdateCursor(user_fire_perimeters, ["FIRE_YEAR_", "INCIDENT", "IRWINID", "attr_FireDiscoveryDateTime", "attr_IncidentName", "attr_IrwinID"]) as cursor:
+            for row in cursor:
+                if row[0]:
+                    row[3] = dt.replace(year=int(row[0]), month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
+                row[4] = row[1]
+                row[5] = row[2]
+                cursor.updateRow(row)
     except:
         arcpy.AddError("Error Reformatting the RDA Perimeters. Exiting.")
         print("Error Reformatting the RDA Perimeters. Exiting.")
@@ -296,37 +366,48 @@ of null features, and projects the dataset to GCS_WGS_1984 accordingly.'''
 try:
     arcpy.AddMessage("Preprocessing Fire Perimeter Feature Class. Subsetting perimeters based on user selected year, repairing geometry, and projecting to GCS_WGS_1984 if needed.")
     print("Preprocessing Fire Perimeter Feature Class. Subsetting perimeters based on user selected year, repairing geometry, and projecting to GCS_WGS_1984 if needed.")
-    # Create a copy of raw fire perimeter data before preprocessing
-    arcpy.management.CopyFeatures(user_fire_perimeters, rawdata)
+    # Create a copy of raw fire perimeter data before preprocessing. Downloads were already extracted into the raw data archive.
+    if user_fire_perimeters != rawdata:
+        arcpy.management.CopyFeatures(user_fire_perimeters, rawdata)
+    user_fire_perimeters = rawdata
     # Subset fires to a calendar year based on the FireYear variable, if specified
     if FireYear is not None:
         print ("Creating a subset of fires to selected calender year: "+FireYear)
         arcpy.AddMessage("Creating a subset of fires to selected calender year: "+FireYear)
-        arcpy.management.MakeFeatureLayer(rawdata, "NIFC_Perims_CYsubset", "attr_FireDiscoveryDateTime >= timestamp '"+FireYear+"-01-01 00:00:00' And attr_FireDiscoveryDateTime <= timestamp '"+FireYear+"-12-31 12:59:59'")
-        arcpy.management.CopyFeatures("NIFC_Perims_CYsubset", user_fire_perimeters)    
+        user_fire_perimeters = os.path.join(localoutputws,"Perimeters")
+        arcpy.conversion.ExportFeatures(rawdata, user_fire_perimeters, "attr_FireDiscoveryDateTime >= timestamp '"+FireYear+"-01-01 00:00:00' And attr_FireDiscoveryDateTime <= timestamp '"+FireYear+"-12-31 23:59:59'")
     # Get the spatial reference of the feature class
     featureClass = (user_fire_perimeters)
     desc = arcpy.Describe(featureClass) 
     spatialRef = desc.spatialReference
     # Check if the spatial reference is GCS_WGS_1984, if not, project to GCS_WGS_1984
-    if spatialRef.Name == "GCS_WGS_1984":
+    if spatialRef.Name == "GCS_WGS_1984" and os.path.normcase(desc.path) == os.path.normcase(localoutputws):
+        # Already GCS_WGS_1984 and in the output geodatabase (downloaded data), so rename it rather than copying every feature
+        arcpy.management.Rename(user_fire_perimeters, final_arch_fc_nm)
+    elif spatialRef.Name == "GCS_WGS_1984":
         arcpy.management.CopyFeatures(user_fire_perimeters, final_arch_fc_nm)
     else:
         print ("Changing Projection from Web Mercator To GCS_WGS_1984")
         arcpy.AddMessage("Changing Projection from Web Mercator To GCS_WGS_1984")
         arcpy.management.Project(user_fire_perimeters,final_arch_fc_nm,'GEOGCS["GCS_WGS_1984",DATUM["D_WGS_1984",SPHEROID["WGS_1984",6378137.0,298.257223563]],PRIMEM["Greenwich",0.0],UNIT["Degree",0.0174532925199433]]',None,'PROJCS["WGS_1984_Web_Mercator_Auxiliary_Sphere",GEOGCS["GCS_WGS_1984",DATUM["D_WGS_1984",SPHEROID["WGS_1984",6378137.0,298.257223563]],PRIMEM["Greenwich",0.0],UNIT["Degree",0.0174532925199433]],PROJECTION["Mercator_Auxiliary_Sphere"],PARAMETER["False_Easting",0.0],PARAMETER["False_Northing",0.0],PARAMETER["Central_Meridian",0.0],PARAMETER["Standard_Parallel_1",0.0],PARAMETER["Auxiliary_Sphere_Type",0.0],UNIT["Meter",1.0]]',"NO_PRESERVE_SHAPE",None,"NO_VERTICAL")
-    arcpy.management.Delete(user_fire_perimeters)
+    # Remove the year subset, but never the raw data archive
+    if user_fire_perimeters != rawdata and arcpy.Exists(user_fire_perimeters):
+        arcpy.management.Delete(user_fire_perimeters)
     # Report the number of features before and after deleting null geometry
-    result = arcpy.GetCount_management(final_arch_fc_nm)
-    countstring = str(result)
+    countstring = str(fastcount(final_arch_fc_nm))
     print(countstring+" Total Features Found Before Deleting Null Geometry.")
     arcpy.AddMessage(countstring+" Total Features Found Before Deleting Null Geometry.")
     # Repair geometry and delete null geometries
     arcpy.RepairGeometry_management(final_arch_fc_nm,"DELETE_NULL")
-    result = arcpy.GetCount_management(final_arch_fc_nm)
-    countstring = str(result)
+    countstring = str(fastcount(final_arch_fc_nm))
     print(countstring+" Total Features Found AFTER Deleting Null Geometry.")
     arcpy.AddMessage(countstring+" Total Features Found AFTER Deleting Null Geometry.")
+    # Index the geometry and the fire name field so the duplicate, identical shape, and invalid name steps do not scan the whole table
+    fieldnames = [f.name for f in arcpy.ListFields(final_arch_fc_nm)]
+    if "Shape" in fieldnames:
+        arcpy.management.AddSpatialIndex(final_arch_fc_nm)
+    if FieldFireName in fieldnames:
+        arcpy.management.AddIndex(final_arch_fc_nm, FieldFireName, "FireName_IDX")
     # If the download selection is "RDA Team Interagency Fire Perimeter Historical Dataset," delete a specific processing file
     if DownloadSelection == "RDA Team Interagency Fire Perimeter Historical Dataset":
         arcpy.management.Delete(os.path.join(scratchworkspace,"InterAgencyFirePerimeterHistory_All_Years_View.shp"))
@@ -343,67 +424,76 @@ except:
 try:
     print("Calculating Acreage and Vertices for Fire Perimeter Data")
     arcpy.AddMessage("Calculating Acreage and Vertices for Fire Perimeter Data")
-    arcpy.management.AddField(final_arch_fc_nm, "TotalCalculatedAcreage", "DOUBLE", None, None, None, "Total Calculated Acreage", "NULLABLE", "NON_REQUIRED", '')
-    arcpy.management.CalculateField(final_arch_fc_nm, "TotalCalculatedAcreage", "!shape.geodesicArea@acres!", "PYTHON3", '', "TEXT")
-    arcpy.analysis.Statistics(final_arch_fc_nm, PreDissAcreageTable, "TotalCalculatedAcreage SUM", None)
-    #This next section sets the total acreage of the raw to date fire perimeters as a variable. Will be referenced later for acreage calculations
-    fc = (PreDissAcreageTable)
-    fields = ['SUM_TotalCalculatedAcreage']
-    with arcpy.da.SearchCursor(fc, fields) as cursor:
-        for row in cursor:
-            PreDissAcreageMath = row[0]
-    arcpy.management.Delete(PreDissAcreageTable) #Delete the output table that holds dissovled acreage to simplify output of tool
-
-    # Analysis to identify features with a user-defined amount of vertices (triangles)
+    print("Identifying Incidents with Null or Possible Invalid Names")
+    arcpy.AddMessage("Identifying Incidents with Null or Possible Invalid Names. This includes 'Erase', 'Test', 'None', and the user input '"+userinputinvalidnametext+"'")
+    # Create a list of values to check for invalid names
+    lstvalues = ['erase','test','none',userinputinvalidnametext.lower()]
+    # Compile the values into one case insensitive pattern so each name is only checked once
+    invalidname = re.compile("|".join(map(re.escape, lstvalues)), re.IGNORECASE)
+    # Add the acreage, invalid name, invalid geometry, and optional vertices fields in one call
+    newfields = [["TotalCalculatedAcreage", "DOUBLE", "Total Calculated Acreage"], ["InvalidName", "TEXT"], ["InvalidGeometry", "TEXT"]]
+    cursorfields = ["SHAPE@", "TotalCalculatedAcreage", FieldFireName, "InvalidName", "InvalidGeometry"]
     if VtxCntTrigger == "true":
         print("Identifying Features with Less Than or Equal to "+str(VerticesCount)+" Vertices.")
         arcpy.AddMessage("Identifying Features with Less Than or Equal to "+str(VerticesCount)+" Vertices.")
-        arcpy.management.AddField(final_arch_fc_nm, "VerticesCount", "LONG", None, None, None, '', "NULLABLE", "NON_REQUIRED", '')
-        arcpy.management.CalculateField(final_arch_fc_nm, "VerticesCount", "!shape!.pointcount", "PYTHON3", '', "TEXT")
-        arcpy.management.MakeFeatureLayer(final_arch_fc_nm, "CntVertxfeatlayer", "VerticesCount <= "+str(VerticesCount))
-        #arcpy.management.CopyFeatures("CntVertxfeatlayer", vtxoutput)
-        result = arcpy.GetCount_management("CntVertxfeatlayer")
-        count = int(result.getOutput(0))
-        if count == 0:
+        newfields.append(["VerticesCount", "LONG"])
+        cursorfields.append("VerticesCount")
+    arcpy.management.AddFields(final_arch_fc_nm, newfields)
+    # Write the geodesic acreage, the invalid name and geometry flags, and the vertex counts with a single cursor pass.
+    # The total acreage of the raw to date fire perimeters is summed in the same pass. Will be referenced later for acreage calculations
+    # A polygon ring needs at least 4 points (the first point is repeated to close it), anything less is flagged as an invalid geometry
+    PreDissAcreageMath = 0
+    vtxcount = 0
+    namecount = 0
+    geomcount = 0
+    with arcpy.da.UpdateCursor(final_arch_fc_nm, cursorfields) as cursor:
+        for row in cursor:
+            if row[2] is None or invalidname.search(str(row[2])):
+                row[3] = "Yes"
+                namecount = namecount+1
+            # A null shape is flagged as an invalid geometry and has no acreage or vertices to count
+            if row[0] is None:
+                row[4] = "Yes"
+                geomcount = geomcount+1
+                cursor.updateRow(row)
+                continue
+            pointcount = row[0].pointCount
+            row[1] = row[0].getArea("GEODESIC", "ACRES")
+            PreDissAcreageMath += row[1]
+            if pointcount < 4:
+                row[4] = "Yes"
+                geomcount = geomcount+1
+            if VtxCntTrigger == "true":
+                row[5] = pointcount
+                if pointcount <= VerticesCount:
+                    vtxcount = vtxcount+1
+            cursor.updateRow(row)
+
+    # Report the features with a user-defined amount of vertices (triangles)
+    if VtxCntTrigger == "true":
+        if vtxcount == 0:
             print("No Features with Less Than or Equal to "+str(VerticesCount)+" Vertices Found.")
             arcpy.AddMessage("No Features with Less Than or Equal to "+str(VerticesCount)+" Vertices Found.")
             #arcpy.management.Delete(vtxoutput)
         else:
-            print(str(count)+" Features with Less Than or Equal to "+str(VerticesCount)+" Vertices Found.")
-            arcpy.AddMessage(str(count)+" Features with Less Than or Equal to "+str(VerticesCount)+" Vertices Found.")
+            print(str(vtxcount)+" Features with Less Than or Equal to "+str(VerticesCount)+" Vertices Found.")
+            arcpy.AddMessage(str(vtxcount)+" Features with Less Than or Equal to "+str(VerticesCount)+" Vertices Found.")
 
-    # Identify features with null or possibly invalid incident names
-    try:
-        print("Identifying Incidents with Null or Possible Invalid Names")
-        arcpy.AddMessage("Identifying Incidents with Null or Possible Invalid Names. This includes 'Erase', 'Test', 'None', and the user input '"+userinputinvalidnametext+"'")
-        # Create a list of values to check for invalid names
-        lstvalues = ['erase','test','none',userinputinvalidnametext.lower()]
-        sqlstring = ""
-        cntvl =  0
-        for value in lstvalues:
-            if cntvl == 0:
-                sqlstring = "lower("+FieldFireName+") LIKE '%"+value+"%' Or ("+FieldFireName+") IS NULL"
-            else:
-                sqlstring = sqlstring+" Or " + "lower("+FieldFireName+") LIKE '%"+value+"%' Or ("+FieldFireName+") IS NULL"
-            cntvl = cntvl+1
-        arcpy.management.AddField(final_arch_fc_nm,"InvalidName","TEXT")
-        # Mark features with invalid names as "Yes"
-        arcpy.management.MakeFeatureLayer(final_arch_fc_nm, "InvalidNameOutputLyr", str(sqlstring))
-        arcpy.management.CalculateField("InvalidNameOutputLyr","InvalidName",'"Yes"',"PYTHON3","","TEXT","NO_ENFORCE_DOMAINS")
-        #arcpy.management.CopyFeatures("InvalidNameOutputLyr", InvldNameOutput)
-        result = arcpy.GetCount_management("InvalidNameOutputLyr")
-        count = int(result.getOutput(0))
-        if count == 0:
-            print("No Features with Invalid Names Found. No Output Feature Class Will be Created.")
-            arcpy.AddMessage("No Features with Invalid Names Found. No Output Feature Class Will be Created.")
-        else:
-            countstring = str(count)
-            print(countstring+" Features with Null or Invalid Names Found.")
-            arcpy.AddMessage(countstring+" Features with Null or Invalid Names Found.")
-            arcpy.AddMessage("The Features With Invalid Names can be found in the output.")
-            print("The Features With Invalid Names can be found in the output.")
-    except:
-        report_error()
+    # Report the features with invalid geometry
+    if geomcount > 0:
+        print(str(geomcount)+" Features with Fewer Than 4 Vertices Flagged as Invalid Geometry.")
+        arcpy.AddMessage(str(geomcount)+" Features with Fewer Than 4 Vertices Flagged as Invalid Geometry.")
+
+    # Report the features with null or possibly invalid incident names
+    if namecount == 0:
+        print("No Features with Invalid Names Found. No Output Feature Class Will be Created.")
+        arcpy.AddMessage("No Features with Invalid Names Found. No Output Feature Class Will be Created.")
+    else:
+        countstring = str(namecount)
+        print(countstring+" Features with Null or Invalid Names Found.")
+        arcpy.AddMessage(countstring+" Features with Null or Invalid Names Found.")
+        arcpy.AddMessage("The Features With Invalid Names can be found in the output.")
+        print("The Features With Invalid Names can be found in the output.")
 except:
     arcpy.AddError("Error Calculating Total Pre and Post Dissolve Acres.")
     print("Error Calculating Total Pre and Post Dissolve Acres.")
@@ -414,23 +504,17 @@ except:
 try:
     print("Looking for Duplicated IRWIN IDs.")
     arcpy.AddMessage("Looking for Duplicated IRWIN IDs.")
-    # Use the Frequency tool to count the frequency of each unique IRWIN ID
-    arcpy.analysis.Frequency(final_arch_fc_nm, "FH_Perimeter_IrwinFreq", "attr_IrwinID", None)
-    arcpy.management.JoinField(final_arch_fc_nm, "attr_IrwinID", "FH_Perimeter_IrwinFreq", "attr_IrwinID", "FREQUENCY")
-    arcpy.management.MakeFeatureLayer(final_arch_fc_nm,"IRWIN_ID_Dups", "FREQUENCY >= 2", None)
-    arcpy.management.CopyFeatures("IRWIN_ID_Dups", IRWIN_ID_Field_Dups)
-    arcpy.management.DeleteField(final_arch_fc_nm, "FREQUENCY")
-    arcpy.management.Delete("FH_Perimeter_IrwinFreq")
-    arcpy.management.Delete("IRWIN_ID_Dups")
-    arcpy.management.Delete(IRWIN_ID_Field_Dups)
-    resultIRWINID = arcpy.GetCount_management(IRWIN_ID_Field_Dups)
-    countIrwinID = int(resultIRWINID.getOutput(0))
+    # Count the frequency of each unique IRWIN ID in memory. Features without an IRWIN ID are not counted as duplicates.
+    irwinids = arcpy.da.TableToNumPyArray(final_arch_fc_nm, ["attr_IrwinID"], null_value="")
+    irwinfreq = pd.Series(irwinids["attr_IrwinID"]).value_counts()
+    irwindups = irwinfreq[(irwinfreq >= 2) & (irwinfreq.index != "")]
+    countIrwinID = int(irwindups.sum())
     if countIrwinID == 0:
         print("No Duplicate Features with the same IRWIN ID Found")
         arcpy.AddMessage("No Duplicate Features with the same IRWIN ID Found")
     else:
-        arcpy.AddMessage("Features That Share the same IRWIN ID have been found")
-        print("Features That Share the same IRWIN ID have been found.")    
+        arcpy.AddMessage(str(countIrwinID)+" Features That Share the same IRWIN ID have been found across "+str(len(irwindups))+" IRWIN IDs")
+        print(str(countIrwinID)+" Features That Share the same IRWIN ID have been found across "+str(len(irwindups))+" IRWIN IDs.")
 except:
     report_error()
 
@@ -439,65 +523,49 @@ except:
 try:
     print("Looking for Identical Incident Shapes With a XY Tolerance of "+str(Identicalshapetolerance)+" METERS")
     arcpy.AddMessage("Looking for Identical Incident Shapes With a XY Tolerance of "+str(Identicalshapetolerance)+" METERS")
-    if Identicalshapetolerance != 0:
-        arcpy.management.FindIdentical(final_arch_fc_nm, "Find_Identical_output_shape", "Shape", str(Identicalshapetolerance)+" METERS", 0, "ONLY_DUPLICATES")
+    #With no tolerance identical shapes are an exact match, which is found by hashing the geometry instead of comparing shapes
+    if float(Identicalshapetolerance) == 0:
+        identicals = find_exact_shapes(final_arch_fc_nm)
+    elif shapely is not None:
+        identicals = find_identical_shapes(final_arch_fc_nm, float(Identicalshapetolerance))
     else:
-        arcpy.management.FindIdentical(final_arch_fc_nm, "Find_Identical_output_shape", "Shape", None, 0, "ONLY_DUPLICATES")
-    #Joins output from Find Identical tool to then create a field in the polygons to hold the frequency of duplicates
+        arcpy.management.FindIdentical(final_arch_fc_nm, "Find_Identical_output_shape", "Shape", str(Identicalshapetolerance)+" METERS", 0, "ONLY_DUPLICATES")
+        with arcpy.da.SearchCursor("Find_Identical_output_shape", ["IN_FID", "FEAT_SEQ"]) as cursor:
+            identicals = dict(cursor)
+        arcpy.management.Delete("Find_Identical_output_shape")
+    #The frequency of each set of duplicates and its first (lowest OBJECTID) feature are worked out in memory rather than with Statistics tables and joins
     print("Performing Statistical Analysis.")
     arcpy.AddMessage("Performing Statistical Analysis.")
-    arcpy.analysis.Statistics("Find_Identical_output_shape", "Find_Identical_output_shape_SumStats", "FEAT_SEQ COUNT", "FEAT_SEQ")
-    arcpy.management.JoinField("Find_Identical_output_shape", "FEAT_SEQ", "Find_Identical_output_shape_SumStats", "FEAT_SEQ", "FREQUENCY")
-    if DownloadSelection == "RDA Team Interagency Fire Perimeter Historical Dataset":
-        arcpy.management.JoinField(final_arch_fc_nm, "OBJECTID_1", "Find_Identical_output_shape", "IN_FID", "FEAT_SEQ;FREQUENCY")
-    else:
-        arcpy.management.JoinField(final_arch_fc_nm, "OBJECTID", "Find_Identical_output_shape", "IN_FID", "FEAT_SEQ;FREQUENCY")
-    arcpy.management.AlterField(final_arch_fc_nm,"FEAT_SEQ", "DuplicateID", "DuplicateID", "LONG", 4, "NULLABLE", "DO_NOT_CLEAR")
-    #Creates subset of features with shape duplicates and cleans up some data.
-    arcpy.management.MakeFeatureLayer(final_arch_fc_nm, "UserInput_ToDate2021_WildlandFire_FeatLayer", "FREQUENCY > 1")
-    arcpy.management.Delete("Find_Identical_output_shape")
-    arcpy.management.Delete("Find_Identical_output_shape_SumStats")
-    arcpy.AddMessage("Creating Subset of Duplicate Fires")
-    arcpy.management.CopyFeatures("UserInput_ToDate2021_WildlandFire_FeatLayer",All_Dups_Datetime)
-    arcpy.management.Delete("UserInput_ToDate2021_WildlandFire_FeatLayer")
-    #Creates a field to hold duplicated acreage for perimeters
+    frequency = {}
+    firstoid = {}
+    for oid, feat_seq in identicals.items():
+        frequency[feat_seq] = frequency.get(feat_seq, 0)+1
+        if feat_seq not in firstoid or oid < firstoid[feat_seq]:
+            firstoid[feat_seq] = oid
+    #Write the DuplicateID and FREQUENCY fields in one cursor pass. The acreage of every duplicate other than the first feature of its set is the duplicated acreage.
     print("Calculating Duplicated Acreage for Fire Perimeters")
     arcpy.AddMessage("Calculating Duplicated Acreage for Fire Perimeters")
-    arcpy.management.AddField(All_Dups_Datetime, "TotalDuplAcreage", "DOUBLE", None, None, None, "TotalDuplAcreage", "NULLABLE", "NON_REQUIRED", '')
-    arcpy.management.CalculateField(All_Dups_Datetime, "TotalDuplAcreage", "!shape.geodesicArea@acres!", "PYTHON3", '', "TEXT")
-    if DownloadSelection == "RDA Team Interagency Fire Perimeter Historical Dataset":
-        arcpy.analysis.Statistics(All_Dups_Datetime, "DuplSumStats", "OBJECTID_1 FIRST", "DuplicateID")
-        DuplicatedSumStats = "DuplSumStats"
-        arcpy.management.JoinField(All_Dups_Datetime, "OBJECTID", DuplicatedSumStats, "FIRST_OBJECTID_1", "DuplicateID;FIRST_OBJECTID_1")
-        arcpy.management.MakeFeatureLayer(All_Dups_Datetime, "AllToDateDups_JoinISNotNull", "FIRST_OBJECTID_1 IS NULL")
-    else:
-        arcpy.analysis.Statistics(All_Dups_Datetime, "DuplSumStats", "OBJECTID FIRST", "DuplicateID")
-        DuplicatedSumStats = "DuplSumStats"
-        arcpy.management.JoinField(All_Dups_Datetime, "OBJECTID", DuplicatedSumStats, "FIRST_OBJECTID", "DuplicateID;FIRST_OBJECTID")
-        arcpy.management.MakeFeatureLayer(All_Dups_Datetime, "AllToDateDups_JoinISNotNull", "FIRST_OBJECTID IS NULL")
-    arcpy.management.Delete(DuplicatedSumStats)
-    arcpy.analysis.Statistics("AllToDateDups_JoinISNotNull", DuplicatedAcreage, "TotalDuplAcreage SUM", None)
-    duplfc = (DuplicatedAcreage)
+    arcpy.management.AddFields(final_arch_fc_nm, [["DuplicateID", "LONG", "DuplicateID"], ["FREQUENCY", "LONG"]])
+    countDuplicatedAcreage = 0
+    #DuplicAcreagestr holds total duplicated acreage to print later
+    DuplicAcreagestr = 0
+    with arcpy.da.UpdateCursor(final_arch_fc_nm, ["OID@", "TotalCalculatedAcreage", "DuplicateID", "FREQUENCY"]) as cursor:
+        for row in cursor:
+            feat_seq = identicals.get(row[0])
+            if feat_seq is not None:
+                row[2] = feat_seq
+                row[3] = frequency[feat_seq]
+                cursor.updateRow(row)
+                if row[0] != firstoid[feat_seq]:
+                    countDuplicatedAcreage = countDuplicatedAcreage+1
+                    DuplicAcreagestr += row[1] or 0
     #check if any duplicates exist
-    resultDuplicatedAcreage = arcpy.GetCount_management(DuplicatedAcreage)
-    countDuplicatedAcreage = int(resultDuplicatedAcreage.getOutput(0))
     if countDuplicatedAcreage == 0:
         print("No Duplicate Features Found.")
         arcpy.AddMessage("No Duplicate Features Found.")
-    else:
-        duplfields = ['SUM_TotalDuplAcreage']
-        #DuplicAcreagestr holds total duplicated acreage as a string to print later
-        with arcpy.da.SearchCursor(duplfc, duplfields) as cursor:
-            for row in cursor:
-                DuplicAcreagestr = row[0]
-        if DownloadSelection == "RDA Team Interagency Fire Perimeter Historical Dataset":
-            arcpy.management.DeleteField(All_Dups_Datetime, "TotalDuplAcreage;DuplicateID_1;FIRST_OBJECTID_1", "DELETE_FIELDS")
-        else:
-            arcpy.management.DeleteField(All_Dups_Datetime, "TotalDuplAcreage;DuplicateID_1;FIRST_OBJECTID", "DELETE_FIELDS")
     #Delete unneeded datasets/Clean up workspace
-    arcpy.management.Delete(DuplicatedAcreage)
-    arcpy.management.Delete(os.path.join(localoutputws,"Perimeters"))
-    arcpy.management.Delete(All_Dups_Datetime)###########################################Comment out if you want duplicates in its own FC
+    if arcpy.Exists(os.path.join(localoutputws,"Perimeters")):
+        arcpy.management.Delete(os.path.join(localoutputws,"Perimeters"))
 except:
     arcpy.AddError("Error Looking for Identical Incident Shapes")
     print("Error Looking for Identical Incident Shapes.")
@@ -505,29 +573,36 @@ except:
     sys.exit()
 
 ###If user wants to identify perimeters that fall outside of US, a feature named "USA5kmBuffer" will need to be placed in the scratch workspace: os.path.join(scratchworkspace,"USA5kmBuffer")
-### This portion of code identifies perimeters that fall outside of the USA
-##try:
-##    print("Looking for Features Outside of USA")
-##    arcpy.AddMessage("Looking for Features Outside of USA")
-##    arcpy.management.AddField(final_arch_fc_nm,"OutsideOfUSA","TEXT")
-##    arcpy.management.MakeFeatureLayer(final_arch_fc_nm,"NIFS_Perims")
-##    arcpy.management.SelectLayerByLocation("NIFS_Perims","INTERSECT",USA5kmBuffer,None,"NEW_SELECTION","INVERT")
-##    
-##    outofUSA = arcpy.GetCount_management("NIFS_Perims")
-##    count = int(outofUSA.getOutput(0))
-##    if count == 0:
-##        print("No Features Found Outside of US.")
-##        arcpy.AddMessage("No Features Found Outside of US.")
-##        arcpy.management.DeleteField(final_arch_fc_nm, "OutsideOfUSA", "DELETE_FIELDS")
-##    else:
-##        print("Features Found Outside of US.")
-##        arcpy.AddMessage("Features Found Outside of US.")
-##        arcpy.management.CalculateField("NIFS_Perims","OutsideOfUSA",'"Yes"',"PYTHON3","","TEXT","NO_ENFORCE_DOMAINS")
-##except:
-##    arcpy.AddError("Error Looking for Features Outside of USA")
-##    print("Error Looking for Features Outside of USA")
-##    report_error()
-##    sys.exit()
+### This portion of code identifies perimeters that fall outside of the USA. It is skipped when there is no USA5kmBuffer.
+if arcpy.Exists(USA5kmBuffer):
+    try:
+        print("Looking for Features Outside of USA")
+        arcpy.AddMessage("Looking for Features Outside of USA")
+        if shapely is not None:
+            outofUSA = find_outside_features(final_arch_fc_nm, USA5kmBuffer)
+        else:
+            arcpy.management.MakeFeatureLayer(final_arch_fc_nm,"NIFS_Perims")
+            arcpy.management.SelectLayerByLocation("NIFS_Perims","INTERSECT",USA5kmBuffer,None,"NEW_SELECTION","INVERT")
+            with arcpy.da.SearchCursor("NIFS_Perims", ["OID@"]) as cursor:
+                outofUSA = set(row[0] for row in cursor)
+            arcpy.management.Delete("NIFS_Perims")
+        if len(outofUSA) == 0:
+            print("No Features Found Outside of US.")
+            arcpy.AddMessage("No Features Found Outside of US.")
+        else:
+            print(str(len(outofUSA))+" Features Found Outside of US.")
+            arcpy.AddMessage(str(len(outofUSA))+" Features Found Outside of US.")
+            arcpy.management.AddField(final_arch_fc_nm,"OutsideOfUSA","TEXT")
+            with arcpy.da.UpdateCursor(final_arch_fc_nm, ["OID@", "OutsideOfUSA"]) as cursor:
+                for row in cursor:
+                    if row[0] in outofUSA:
+                        row[1] = "Yes"
+                        cursor.updateRow(row)
+    except:
+        arcpy.AddError("Error Looking for Features Outside of USA")
+        print("Error Looking for Features Outside of USA")
+        report_error()
+        sys.exit()
 
 # Prints a summary of acreages calculated
 try:
@@ -547,6 +622,7 @@ except:
 try:
     print("Writing Metadata to Output Feature Classes")
     arcpy.AddMessage("Writing Metadata to Output Feature Classes")
+    from arcpy import metadata as md
     tgt_item_md = md.Metadata(final_arch_fc_nm)
     tgt_item_md.importMetadata(QAQCsourcemetadatapath)
     tgt_item_md.save()
@@ -556,6 +632,5 @@ except:
     report_error()
     sys.exit()
 
-
 print("Script Finished Running.")
 arcpy.AddMessage("Script Finished")
@@ -20,7 +20,9 @@ The resulting firelines are then dissolved to give the user a simplified firelin
 """
 #import libraries
 import arcpy, os, sys, requests, traceback
+import pandas as pd
 from datetime import datetime, timezone
+from hashlib import blake2b
 
 #User Set Hardcoded parameters from ArcPro Tool
 QAQC_Firelines_ToDiss = arcpy.GetParameter(0)  #feature set type input parameter.
@@ -82,23 +84,18 @@ try:
     print("Identifying Most Common Inc Name and IRWIN ID and Attributing Them to All Input Firelines")
     arcpy.AddMessage("Identifying Most Common Inc Name and IRWIN ID and Attributing Them to All Input Firelines")
     arcpy.conversion.ExportFeatures(QAQC_Firelines_ToDiss,"Firelines_OneFireDiss")
-    arcpy.analysis.Statistics("Firelines_OneFireDiss","OpsData_Statistics","IncidentName COUNT;IRWINID COUNT","IncidentName;IRWINID","")
-    #Exporting table view occasionally gets rid of IRWIN ID unless you copy it. ESRI Bug? Get around this by making new irwin ID field
-    arcpy.management.AddField("OpsData_Statistics","IRWIN2","TEXT")
-    arcpy.management.CalculateField("OpsData_Statistics","IRWIN2","!IRWINID!")
-    #Make table view capturing most common IRWIN and Name
-    arcpy.management.MakeTableView("OpsData_Statistics","OpsData_Statistics_View","COUNT_IncidentName = (SELECT MAX(COUNT_IncidentName) FROM OpsData_Statistics) AND COUNT_IRWINID = (SELECT MAX(COUNT_IRWINID) FROM OpsData_Statistics)")
-    #Export table view
-    arcpy.conversion.ExportTable("OpsData_Statistics_View","OpsData_Stats_MstCmn")
-    #Create fields to join data
-    arcpy.management.AddField("OpsData_Stats_MstCmn","CommonJoin","LONG")
-    arcpy.management.AddField("Firelines_OneFireDiss","CommonJoin","LONG")
-    arcpy.management.CalculateField("Firelines_OneFireDiss","CommonJoin","1")
-    arcpy.management.CalculateField("OpsData_Stats_MstCmn","CommonJoin","1")
-    arcpy.management.DeleteField("Firelines_OneFireDiss","IncidentName;IRWINID","DELETE_FIELDS")
-    arcpy.management.JoinField("Firelines_OneFireDiss","CommonJoin","OpsData_Stats_MstCmn","CommonJoin","IRWINID;IncidentName","NOT_USE_FM",None)
-    arcpy.management.Delete("OpsData_Stats_MstCmn")
-    arcpy.management.DeleteField("Firelines_OneFireDiss","CommonJoin","DELETE_FIELDS")
+    #Find the most common Incident Name and IRWIN ID pair in memory. Null values are read as empty strings and dropped so that, as with a count statistic, they are never picked.
+    firelines = pd.DataFrame(arcpy.da.TableToNumPyArray("Firelines_OneFireDiss",["IncidentName","IRWINID"],null_value=""))
+    firelines = firelines[(firelines["IncidentName"] != "") & (firelines["IRWINID"] != "")]
+    #Attribute the most common Incident Name and IRWIN ID to all firelines. If no fireline has both, the fields are left as they are.
+    if firelines.empty:
+        arcpy.AddWarning("No Firelines Have Both an Inc Name and IRWIN ID. Inc Name and IRWIN ID Left Unchanged")
+        print("No Firelines Have Both an Inc Name and IRWIN ID. Inc Name and IRWIN ID Left Unchanged")
+    else:
+        mostcommon = list(firelines.groupby(["IncidentName","IRWINID"]).size().idxmax())
+        with arcpy.da.UpdateCursor("Firelines_OneFireDiss",["IncidentName","IRWINID"]) as cursor:
+            for row in cursor:
+                cursor.updateRow(mostcommon)
 except:
     arcpy.AddError("Error Attributing Inc and IRWIN to Firelines... Exiting")
     print("Error Attributing Inc and IRWIN to Firelines... Exiting")
@@ -107,32 +104,22 @@ except:
 
 try:
     #Remove duplicates based on shape and Incident Name, Line Type, and IRWIN ID.
-    arcpy.management.MultipartToSinglepart("Firelines_OneFireDiss","SinglepartFirelines2")
-    arcpy.management.FindIdentical("SinglepartFirelines2","FindIdentical2","Shape;IncidentName;FeatureCategory;IRWINID;FirelineCatPrioritizationAsgn",xy_tolerance=None,z_tolerance=0,output_record_option="ONLY_DUPLICATES")
-    arcpy.management.JoinField("SinglepartFirelines2","OBJECTID","FindIdentical2","IN_FID","FEAT_SEQ")
-    #Select only features that were identified to have identical features.
-    arcpy.management.MakeFeatureLayer("SinglepartFirelines2","UserInputFireline_dups","FEAT_SEQ IS NOT NULL")
-    #Dissolve features that were duplicates
-    arcpy.analysis.PairwiseDissolve("UserInputFireline_dups","DupsDisssglpt2","IncidentName;FeatureCategory;FirelineCatPrioritizationAsgn;IRWINID;FEAT_SEQ",None,"SINGLE_PART","")
-    #Delete features that were dissolved from fireline data.
-    arcpy.management.DeleteFeatures("UserInputFireline_dups")
-    #Several Identicals still found due to issues with Find Identical Tool. Delete Feat Seq field and rerun
-    arcpy.management.DeleteField("DupsDisssglpt2","FEAT_SEQ","DELETE_FIELDS")
-    arcpy.management.FindIdentical("DupsDisssglpt2","Dups_findIdent2",fields="Shape;IncidentName;FeatureCategory;IRWINID;FirelineCatPrioritizationAsgn",xy_tolerance="0 Meters",z_tolerance=0,output_record_option="ONLY_DUPLICATES")
-    arcpy.management.JoinField(in_data="DupsDisssglpt2",in_field="OBJECTID",join_table="Dups_findIdent2",join_field="IN_FID",fields="FEAT_SEQ",fm_option="NOT_USE_FM",field_mapping=None)
-    #Dissolve again to rid of identical overlaps.. again
-    arcpy.analysis.PairwiseDissolve("DupsDisssglpt2","DupsDissrnd2","IncidentName;IRWINID;FirelineCatPrioritizationAsgn;FEAT_SEQ;FeatureCategory",None,"SINGLE_PART","")
-    arcpy.Delete_management("Firelines_OneFireDiss")
-    #Merge final results
-    arcpy.management.Merge("SinglepartFirelines2;DupsDissrnd2","Firelines_OneFireDiss")
-    arcpy.management.DeleteField("Firelines_OneFireDiss","ORIG_FID;FEAT_SEQ","DELETE_FIELDS")
+    #Exact duplicates are dropped first by hashing each line's WKB with its attributes so the dissolve has fewer lines to merge.
+    seen = set()
+    with arcpy.da.UpdateCursor("Firelines_OneFireDiss",["SHAPE@WKB","IncidentName","IRWINID","FeatureCategory","FirelineCatPrioritizationAsgn"]) as cursor:
+        for row in cursor:
+            if row[0] is None:
+                continue
+            key = blake2b(bytes(row[0])+repr(row[1:]).encode(), digest_size=16).digest()
+            if key in seen:
+                cursor.deleteRow()
+            else:
+                seen.add(key)
+    #The dissolve merges every fireline that shares these attributes, identical shapes included, so no separate Find Identical pass is needed.
     arcpy.analysis.PairwiseDissolve("Firelines_OneFireDiss",ReprocessedOpsData,"IRWINID;IncidentName;FeatureCategory;FirelineCatPrioritizationAsgn",None,"MULTI_PART","")
     #Clean up workspace
-    fc_Delete = ["OpsData_Statistics","SinglepartFirelines2","FindIdentical2","DupsDisssglpt2","Dups_findIdent2","DupsDissrnd2","Firelines_OneFireDiss"]
-    for fc in fc_Delete:
-        fc_path = os.path.join(localoutputws, fc)
-        if arcpy.Exists(fc_path):
-            arcpy.Delete_management(fc_path)
+    if arcpy.Exists("Firelines_OneFireDiss"):
+        arcpy.management.Delete("Firelines_OneFireDiss")
 except:
     arcpy.AddError("Error #Remove duplicates based on shape and Incident Name, Line Type, and IRWIN ID.... Exiting")
     print("Error #Remove duplicates based on shape and Incident Name, Line Type, and IRWIN ID.... Exiting")
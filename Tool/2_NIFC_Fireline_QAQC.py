@@ -70,11 +70,20 @@ Finally, the script concludes with metadata writing to the output feature classe
 The final output is a set of processed, consistent, and clean geospatial datasets ready for further analysis or reporting on fire incidents and operations.
 """
 #import libraries
-import arcpy, os, urllib, sys, requests, traceback
+import arcpy, json, os, re, sys, requests, traceback
 from arcpy import metadata as md
 from zipfile import ZipFile
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from sys import argv
 from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+# shapely is not part of the default ArcGIS Pro environment. When it is installed the point of origin and fireline state lookups and the perimeter buffer selection use shapely STRtrees, otherwise the geoprocessing tools are used.
+try:
+    import shapely
+except ImportError:
+    shapely = None
 
 # User-defined parameters for use in ArcGIS Pro
 Hist_fire_perimeters = arcpy.GetParameter(0)  # Optional parameter to input feature set for historical fire perimeters.
@@ -99,38 +108,133 @@ def report_error():
     arcpy.AddMessage(msgs)
     print(pymsg)
     print(msgs)
-#Function to download zipfile, unzip, create a feature class, and delete intermin data
-def dwnld_unzip_filter(url_addrs,tozip,dwnld_fcnm,fnl_fgdb):
-    #Download the Wildfire Perimeters off of the web
+#Function to write a status message to the geoprocessing messages and the console. level is "message", "warning", or "error".
+def log(msg,level="message"):
+    if level == "error":
+        arcpy.AddError(msg)
+    elif level == "warning":
+        arcpy.AddWarning(msg)
+    else:
+        arcpy.AddMessage(msg)
+    print(msg)
+#Function to download zipfile and unzip the fgdb into the scratch folder. Returns the path to the feature class in the unzipped fgdb.
+#The feature class is read in place by the filtering step rather than copied into the output fgdb first.
+#The zip is kept as a download cache. A sidecar json records the server's ETag and Last-Modified headers and the zip is only downloaded again when they change.
+def dwnld_unzip_filter(url_addrs,tozip,dwnld_fcnm):
+    #Download the Operational Data Archive off of the web. The zip is streamed to disk in 8 MB chunks rather than held in memory.
+    #Dropped connections and server errors are retried with a backoff instead of failing the whole run.
+    cacheinfo = tozip+".json"
     try:
-        urllib.request.urlretrieve(url_addrs,tozip)  #This is unique to python 3... will not work if run from ArcGIS Desktop
+        with requests.Session() as session:
+            session.mount("https://", HTTPAdapter(max_retries=Retry(total=3, backoff_factor=1, status_forcelist=[500, 502, 503, 504])))
+            head = session.head(url_addrs, allow_redirects=True, timeout=60)
+            version = {"ETag": head.headers.get("ETag"), "Last-Modified": head.headers.get("Last-Modified")} if head.ok else {}
+            cached = None
+            if os.path.exists(tozip) and os.path.exists(cacheinfo):
+                with open(cacheinfo) as cacheread:
+                    cached = json.load(cacheread)
+            if any(version.values()) and cached == version:
+                log("...Archive unchanged since last download. Using cached file: "+tozip)
+            else:
+                if os.path.exists(cacheinfo):
+                    os.remove(cacheinfo)
+                with session.get(url_addrs, stream=True, timeout=60) as response:
+                    response.raise_for_status()
+                    with open(tozip, "wb") as zipout:
+                        for chunk in response.iter_content(chunk_size=8*1024*1024):
+                            zipout.write(chunk)
+                with open(cacheinfo, "w") as cachewrite:
+                    json.dump(version, cachewrite)
     except:
-        arcpy.AddWarning("Could not retrieve file from web URL address: "+url_addrs)
-        print("Could not retrieve file from web URL address: "+url_addrs)
-        report_error()
+        #The sidecar is only written after a complete download, so the cached zip is only used when it is there
+        if os.path.exists(tozip) and os.path.exists(cacheinfo):
+            log("Could not retrieve file from web URL address: "+url_addrs+". Using the previously downloaded file instead: "+tozip,"warning")
+            report_error()
+        else:
+            log("Could not retrieve file from web URL address: "+url_addrs+". No previous download is available.","warning")
+            raise
     #Unzip the fgdb, grab the fgdb name, and feature class name
     try:
         arcpy.AddMessage("...UnZipping file: "+tozip)
-        zipA = ZipFile(tozip)
-        nm_list = zipA.namelist()
-        zipA.extractall(scratchfolder)
-        nifs_fp_fgdbnm = os.path.dirname(nm_list[0]) #this get the 'directory name' of the first item in the list of files within the zipfile. The fgdb name.
+        with ZipFile(tozip) as zipA:
+            nm_list = zipA.namelist()
+            nifs_fp_fgdbnm = os.path.dirname(nm_list[0]) #this get the 'directory name' of the first item in the list of files within the zipfile. The fgdb name.
+            #Only extract the members of the fgdb, skipping any documents packaged beside it.
+            zipA.extractall(scratchfolder,[nm for nm in nm_list if nm.startswith(nifs_fp_fgdbnm+"/")])
         nifs_fp_fcnm = os.path.join(scratchfolder,nifs_fp_fgdbnm,dwnld_fcnm)
-        arcpy.FeatureClassToFeatureClass_conversion(nifs_fp_fcnm,fnl_fgdb,dwnld_fcnm)
-        zipA.close()
     except:
-        arcpy.AddWarning("Could not unzip downloaded dataset.")
-        print("Could not unzip downloaded dataset.")
-        report_error()
-    #Cleanup interim data not needed.
-    arcpy.AddMessage("...Deleting interim data.")
-    try:
-        os.remove(tozip)   #deleting the zip file itself
-        arcpy.Delete_management(os.path.join(scratchfolder,nifs_fp_fgdbnm)) #deleting the fgdb unzipped into the scratch folder
-    except:
-        report_error()
-        arcpy.AddWarning("Some interim data was not delete from the directory.")
-        print("Some interim data was not delete from the directory.")
+        log("Could not unzip downloaded dataset.","warning")
+        raise
+    #The unzipped fgdb is deleted once the ops data has been filtered.
+    return nifs_fp_fcnm
+
+#Shapely STRtree of the US state polygons. It is built by the first state lookup and reused by every later one.
+state_index = None
+def states_tree():
+    global state_index
+    if state_index is None:
+        names = []
+        states = []
+        with arcpy.da.SearchCursor(USStates, ["US_POO_State", "SHAPE@WKB"]) as cursor:
+            for row in cursor:
+                names.append(row[0])
+                states.append(shapely.from_wkb(bytes(row[1])))
+        state_index = (shapely.STRtree(states), names, arcpy.Describe(USStates).spatialReference)
+    return state_index
+
+#Function to find the state each feature falls in. Like the intersect fallback, a feature that crosses state lines gets the state holding the largest part of it.
+#Returns a dictionary of {OBJECTID: state}
+def find_poo_states(in_fc):
+    tree, names, states_sr = states_tree()
+    oids = []
+    geoms = []
+    with arcpy.da.SearchCursor(in_fc, ["OID@", "SHAPE@WKB"], spatial_reference=states_sr) as cursor:
+        for row in cursor:
+            if row[1] is not None:
+                oids.append(row[0])
+                geoms.append(shapely.from_wkb(bytes(row[1])))
+    geoms = np.array(geoms, dtype=object)
+    feature_idx, state_idx = tree.query(geoms, predicate="intersects")
+    areas = shapely.area(shapely.intersection(geoms[feature_idx], tree.geometries[state_idx]))
+    poo_states = {}
+    largest = {}
+    for i, j, area in zip(feature_idx.tolist(), state_idx.tolist(), areas.tolist()):
+        if i not in largest or area > largest[i]:
+            largest[i] = area
+            poo_states[oids[i]] = names[j]
+    return poo_states
+
+#Function to find every state each fireline crosses, like intersecting the lines with the states. Returns a list of (IRWINID, OrigOID_Link, US_POO_State, IncidentName) rows, one per line and state.
+def find_line_states(in_fc, where_clause=None):
+    tree, names, states_sr = states_tree()
+    attrs = []
+    lines = []
+    with arcpy.da.SearchCursor(in_fc, ["IRWINID", "OrigOID_Link", "IncidentName", "SHAPE@WKB"], where_clause, states_sr) as cursor:
+        for row in cursor:
+            if row[3] is not None:
+                attrs.append(row[:3])
+                lines.append(shapely.from_wkb(bytes(row[3])))
+    line_idx, state_idx = tree.query(lines, predicate="intersects")
+    return [(attrs[i][0], attrs[i][1], names[j], attrs[i][2]) for i, j in zip(line_idx.tolist(), state_idx.tolist())]
+
+#Function to find the features within a distance in meters of any feature in another feature class with a shapely STRtree. Returns a set of OBJECTIDs.
+#The near features are buffered geodesically into memory, like the geoprocessing fallback, so both give the same answer anywhere in the country.
+def find_features_within(in_fc,near_fc,distance):
+    near_buffer = os.path.join(memoryws,"FirePerimsBuffer")
+    arcpy.analysis.PairwiseBuffer(near_fc,near_buffer,str(distance)+" Meters","NONE",None,"GEODESIC","0 DecimalDegrees")
+    in_sr = arcpy.Describe(in_fc).spatialReference
+    with arcpy.da.SearchCursor(near_buffer, ["SHAPE@WKB"], spatial_reference=in_sr) as cursor:
+        near = [shapely.from_wkb(bytes(row[0])) for row in cursor]
+    arcpy.management.Delete(near_buffer)
+    oids = []
+    geoms = []
+    with arcpy.da.SearchCursor(in_fc, ["OID@", "SHAPE@WKB"]) as cursor:
+        for row in cursor:
+            oids.append(row[0])
+            geoms.append(shapely.from_wkb(bytes(row[1])))
+    tree = shapely.STRtree(near)
+    within = tree.query(geoms, predicate="intersects")[0]
+    return set(oids[i] for i in within.tolist())
 
 ###-Variables-###
 try:
@@ -146,40 +250,31 @@ try:
     scratchworkspace = os.path.join(local_root_fld,"ScratchWorkspace","scratch.gdb")
     scratchfolder = os.path.join(local_root_fld,"ScratchWorkspace")
     rawdatastoragegdb = os.path.join(local_root_fld,"NIFC_DL_RawDataArchive","RawDLArchive.gdb")
+    memoryws = "memory" #In-memory workspace for intermediate data and the ops data while it is QAQC'd
+    OpsData_Complt = os.path.join(memoryws,"OpsDataArchive_Complt")
     QAQCsourcemetadatapath = os.path.join(local_root_fld,"Metadata","OpsData_QAQC.xml")
     
     # URLs to NIFC data. Update as needed.
     
     # URL to full history WFIGS Wildland Fire Perimeters
     nifc_pbl_fullhistory_url = "https://opendata.arcgis.com/api/v3/datasets/585b8ff97f5c45fe924d3a1221b446c6_0/downloads/data?format=fgdb&spatialRefId=4326"
-    # Conditional URLs based on the fire year
-    if FireYear == "2017":
-        # URL to Operational Data Archive 2017
-        nifc_pbl_OpsData_url = "https://opendata.arcgis.com/api/v3/datasets/ebcb160b82a242369caf0b7ed9640ac7_1/downloads/data?format=fgdb&spatialRefId=4326&where=1%3D1"
-    if FireYear == "2018":
-        # URL to Operational Data Archive 2018
-        nifc_pbl_OpsData_url = "https://opendata.arcgis.com/api/v3/datasets/2aa165c74bf040f1a44c63b505f1a940_1/downloads/data?format=fgdb&spatialRefId=4326&where=1%3D1"
-    if FireYear == "2019":
-        # URL to Operational Data Archive 2019
-        nifc_pbl_OpsData_url = "https://opendata.arcgis.com/api/v3/datasets/2827d083ddc14464a8eab3181e8bf13e_0/downloads/data?format=fgdb&spatialRefId=4326&where=1%3D1"
-    if FireYear == "2020":
-        # URL to Operational Data Archive 2020
-        nifc_pbl_OpsData_url = "https://www.arcgis.com/sharing/rest/content/items/ea843f7f091f4c7f9743798b64c864be/data"
-    if FireYear == "2021":
-        # URL to Operational Data Archive 2021
-        nifc_pbl_OpsData_url = "https://www.arcgis.com/sharing/rest/content/items/af727c41d79643b091cee372233110d4/data"
-    if FireYear == "2022":
-        # URL to Operational Data Archive 2022
-        nifc_pbl_OpsData_url = "https://opendata.arcgis.com/api/v3/datasets/696c45c4ecd34948b1ae87d2f567e347_5/downloads/data?format=fgdb&spatialRefId=4326&where=1%3D1"
-    if FireYear == "2023":
-        # URL to Operational Data Archive 2023
-        nifc_pbl_OpsData_url = "https://opendata.arcgis.com/api/v3/datasets/5c5cdca154e84eb39b022a6b9ebb31ff_5/downloads/data?format=fgdb&spatialRefId=4326&where=1%3D1"
+    # URL to each Operational Data Archive and the name of the feature class inside its fgdb, keyed by fire year.
+    # The feature class name is formatted differently at the source depending on the year (some have extra underscores).
+    OpsData_YearConfig = {
+        "2017": ("https://opendata.arcgis.com/api/v3/datasets/ebcb160b82a242369caf0b7ed9640ac7_1/downloads/data?format=fgdb&spatialRefId=4326&where=1%3D1","EventLine2017"),
+        "2018": ("https://opendata.arcgis.com/api/v3/datasets/2aa165c74bf040f1a44c63b505f1a940_1/downloads/data?format=fgdb&spatialRefId=4326&where=1%3D1","EventLine2018"),
+        "2019": ("https://opendata.arcgis.com/api/v3/datasets/2827d083ddc14464a8eab3181e8bf13e_0/downloads/data?format=fgdb&spatialRefId=4326&where=1%3D1","EventLine2019"),
+        "2020": ("https://www.arcgis.com/sharing/rest/content/items/ea843f7f091f4c7f9743798b64c864be/data","EventLine"),
+        "2021": ("https://www.arcgis.com/sharing/rest/content/items/af727c41d79643b091cee372233110d4/data","Event_Line_2021"),
+        "2022": ("https://opendata.arcgis.com/api/v3/datasets/696c45c4ecd34948b1ae87d2f567e347_5/downloads/data?format=fgdb&spatialRefId=4326&where=1%3D1","EventLine2022"),
+        "2023": ("https://opendata.arcgis.com/api/v3/datasets/5c5cdca154e84eb39b022a6b9ebb31ff_5/downloads/data?format=fgdb&spatialRefId=4326&where=1%3D1","Event_Line"),
+    }
         
 #Hardcoded Inputs used for processing
     USStates = os.path.join(scratchworkspace,"USStates")
     # Set output variable names conditionally based on the DownloadOpsDataTrigger flag and the FireYear
     if DownloadOpsDataTrigger == "true":
-        if FireYear in ["2017","2018","2019","2020","2021","2022","2023"]:
+        if FireYear in OpsData_YearConfig:
             final_Hist_fire_perimeters = "UserInputFirePerims_"+FireName+"_CY"+FireYear+"_"+datetime  
             final_OpsDataArchive = "OpsData_Final_"+FireName+"_CY"+FireYear+"_"+datetime
             QAQCd_OpsData = "OpsData_QAQC_"+FireName+"_CY"+FireYear+"_"+datetime
@@ -191,8 +286,7 @@ try:
         RawOpsData = "RawOpsData_CY"+UserProvidedFireYear+"_"+datetime
     
 except:
-    arcpy.AddError("Variables could not be set. Exiting...")
-    print("Variables could not be set. Exiting...")
+    log("Variables could not be set. Exiting...","error")
     report_error()
     sys.exit()
     
@@ -204,84 +298,28 @@ try:
     arcpy.env.scratchWorkspace = scratchworkspace
     arcpy.env.workspace = localoutputws
 except:
-    arcpy.AddError("Evironments could not be set. Exiting...")
-    print("Evironments could not be set. Exiting...")
+    log("Evironments could not be set. Exiting...","error")
     sys.exit()
 
 ### - Begin Process - ###
 # Check if operational data download is triggered and proceed based on the fire year
 if DownloadOpsDataTrigger == "true":
-    # Download and process the Operational Data Archive for the specified FireYear
-    if FireYear in ["2021"]: 
-        try:
-            print("Downloading Operational Data Archive "+FireYear)
-            arcpy.AddMessage("Downloading Operational Data Archive "+FireYear)
-            temparchzip = os.path.join(scratchfolder,"NIFC_"+FireYear+"_OpsDataArchive_"+datetime+".zip")
-            dwnld_unzip_filter(nifc_pbl_OpsData_url,temparchzip,"Event_Line_"+FireYear,localoutputws)
-            NIFC_OpsDataArchive = os.path.join(localoutputws,"Event_Line_"+FireYear)
-            # Announce Completion and final feature class name:
-            arcpy.AddMessage("The downloaded NIFC Operational Data is located in: "+localoutputws+" and is named: "+final_OpsDataArchive)
-            print("The downloaded NIFC Operational Data is located in: "+localoutputws+" and is named: "+final_OpsDataArchive)
-        except:
-            arcpy.AddError("Error downloading and unzipping the Operational Data Archive "+FireYear+". Check URL. Exiting.")
-            print("Error downloading and unzipping the Operational Data Archive "+FireYear+". Check URL. Exiting.")
-            report_error()
-            sys.exit()
-    #Download the Operational data for 2020 from NIFS
-    if FireYear in ["2020"]: 
-        try:
-            print("Downloading Operational Data Archive "+FireYear)
-            arcpy.AddMessage("Downloading Operational Data Archive "+FireYear)
-            temparchzip = os.path.join(scratchfolder,"NIFC_"+FireYear+"_OpsDataArchive_"+datetime+".zip")
-            dwnld_unzip_filter(nifc_pbl_OpsData_url,temparchzip,"EventLine",localoutputws)
-            NIFC_OpsDataArchive = os.path.join(localoutputws,"EventLine")
-            # Announce Completion and final feature class name:
-            arcpy.AddMessage("The downloaded NIFC Operational Data is located in: "+localoutputws+" and is named: "+final_OpsDataArchive)
-            print("The downloaded NIFC Operational Data is located in: "+localoutputws+" and is named: "+final_OpsDataArchive)
-        except:
-            arcpy.AddError("Error downloading and unzipping the Operational Data Archive "+FireYear+". Check URL. Exiting.")
-            print("Error downloading and unzipping the Operational Data Archive "+FireYear+". Check URL. Exiting.")
-            report_error()
-            sys.exit()
-        #Download the Operational data for 2020 from NIFS
-    if FireYear in ["2023"]: 
-        try:
-            print("Downloading Operational Data Archive "+FireYear)
-            arcpy.AddMessage("Downloading Operational Data Archive "+FireYear)
-            temparchzip = os.path.join(scratchfolder,"NIFC_"+FireYear+"_OpsDataArchive_"+datetime+".zip")
-            dwnld_unzip_filter(nifc_pbl_OpsData_url,temparchzip,"Event_Line",localoutputws)
-            NIFC_OpsDataArchive = os.path.join(localoutputws,"Event_Line")
-            # Announce Completion and final feature class name:
-            arcpy.AddMessage("The downloaded NIFC Operational Data is located in: "+localoutputws+" and is named: "+final_OpsDataArchive)
-            print("The downloaded NIFC Operational Data is located in: "+localoutputws+" and is named: "+final_OpsDataArchive)
-        except:
-            arcpy.AddError("Error downloading and unzipping the Operational Data Archive "+FireYear+". Check URL. Exiting.")
-            print("Error downloading and unzipping the Operational Data Archive "+FireYear+". Check URL. Exiting.")
-            report_error()
-            sys.exit()
-
-    # Download the Operational data for 2018, 2019, and 2022 from NIFS. This is seperate from 2020 and 2021 as the name is formatted differently at the source (has extra underscores)
-    if FireYear in ["2017","2018","2019","2022"]:
-        try:
-            print("Downloading Operational Data Archive "+FireYear)
-            arcpy.AddMessage("Downloading Operational Data Archive "+FireYear)
-            temparchzip = os.path.join(scratchfolder,"NIFC_"+FireYear+"_OpsDataArchive_"+datetime+".zip")
-            dwnld_unzip_filter(nifc_pbl_OpsData_url,temparchzip,"EventLine"+FireYear,localoutputws)
-            NIFC_OpsDataArchive = os.path.join(localoutputws,"EventLine"+FireYear)
-            # Announce Completion and final feature class name:
-            arcpy.AddMessage("The downloaded NIFC Operational Data is located in: "+localoutputws+" and is named: "+final_OpsDataArchive)
-            print("The downloaded NIFC Operational Data is located in: "+localoutputws+" and is named: "+final_OpsDataArchive)
-        except:
-            arcpy.AddError("Error downloading and unzipping the Operational Data Archive "+FireYear+". Check URL. Exiting.")
-            print("Error downloading and unzipping the Operational Data Archive "+FireYear+". Check URL. Exiting.")
-            report_error()
-            sys.exit()
     # Validate that the FireYear is available for processing, exit if not
-    if FireYear not in ["2017","2018","2019","2020","2021","2022","2023"]:
-            arcpy.AddError("Specified year for ops data not available. Exiting.")
-            print("Specified year for ops data not available. Exiting.")
-            report_error()
-            sys.exit()
+    if FireYear not in OpsData_YearConfig:
+        log("Specified year for ops data not available. Exiting.","error")
+        sys.exit()
+    # Download and process the Operational Data Archive for the specified FireYear
+    try:
+        nifc_pbl_OpsData_url, OpsData_fcnm = OpsData_YearConfig[FireYear]
+        log("Downloading Operational Data Archive "+FireYear)
+        temparchzip = os.path.join(scratchfolder,"NIFC_"+FireYear+"_OpsDataArchive.zip")
+        NIFC_OpsDataArchive = dwnld_unzip_filter(nifc_pbl_OpsData_url,temparchzip,OpsData_fcnm)
+        # Announce Completion and final feature class name:
+        log("The downloaded NIFC Operational Data is unzipped in the scratch folder: "+scratchfolder+" and is read from: "+NIFC_OpsDataArchive)
+    except:
+        log("Error downloading and unzipping the Operational Data Archive "+FireYear+". Check URL. Exiting.","error")
+        report_error()
+        sys.exit()
 
 # If download trigger is false, use the user-provided fire year for further processing
 if DownloadOpsDataTrigger == "false":
@@ -292,269 +330,219 @@ Filters operational data based on featureCategory (otherwise interpreted as stat
 It also filters ops data to only the line types of interest as well as removes features labled as "delete this"
 This is done before projecting and repairing geometry as it is not spatially tied, to save time.'''
 try:
-    arcpy.AddMessage("Filtering NIFS Data Based on Attribution")
-    print("Filtering NIFS Data Based on Attribution")
+    log("Filtering NIFS Data Based on Attribution")
     # Perimeter Data
     # Filtering data based on user-selected year and other attributes
-    arcpy.management.MakeFeatureLayer(Hist_fire_perimeters,"Perimeters_"+FireYear, "attr_FireDiscoveryDateTime >= timestamp '"+FireYear+"-01-01 00:00:00' And attr_FireDiscoveryDateTime <= timestamp '"+FireYear+"-12-31 23:59:59'")
-    result = arcpy.GetCount_management("Perimeters_"+FireYear)
-    count = int(result.getOutput(0))
+    #The year subset is written in one step with the where clause and then counted, rather than counted on a layer and copied
+    arcpy.analysis.Select(Hist_fire_perimeters,"HistFirePerims_"+FireYear, "attr_FireDiscoveryDateTime >= timestamp '"+FireYear+"-01-01 00:00:00' And attr_FireDiscoveryDateTime <= timestamp '"+FireYear+"-12-31 23:59:59'")
+    count = int(arcpy.management.GetCount("HistFirePerims_"+FireYear)[0])
     if count == 0:
-        arcpy.AddMessage("No fire perimeters found. Will not continue")
-        print("No fire perimeters found. Will not continue")
+        log("No fire perimeters found. Will not continue")
+        arcpy.management.Delete("HistFirePerims_"+FireYear)
         sys.exit()
-    arcpy.management.CopyFeatures("Perimeters_"+FireYear, "HistFirePerims_"+FireYear)
     #OPS Data
     # Filter operational data by feature category and remove entries marked for deletion
     #Keep a time stamped copy of the raw data so user can compare processed vs unprocessed data
     arcpy.management.CopyFeatures(NIFC_OpsDataArchive,os.path.join(rawdatastoragegdb,RawOpsData))
-    #Filter ops data based on feature category field
-    arcpy.management.MakeFeatureLayer(NIFC_OpsDataArchive,"OpsDataArchive_fltr", "FeatureCategory IN ('Completed Burnout', 'Completed Dozer Line', 'Completed Fuel Break', 'Completed Hand Line', 'Completed Mixed Construction Line', 'Completed Plow Line', 'Completed Road as Line', 'Road as Completed Line')",)
-    arcpy.management.CopyFeatures("OpsDataArchive_fltr", "OpsDataArchive_Complt")
-    #Filter ops data based on delete field
-    arcpy.management.MakeFeatureLayer("OpsDataArchive_Complt", "OpsDataArchive_deletethis", "DeleteThis IN ('Yes', 'Yes - Editing Mistake', 'Yes - No Longer Needed')")
-    #arcpy.management.MakeFeatureLayer("OpsDataArchive_Complt", "OpsDataArchive_deletethis", "DeleteThis IN ('Yes - Editing Mistake', 'Yes - No Longer Needed') Or FeatureStatus IN ('Proposed') Or FeatureStatus IS NULL")
-    arcpy.management.DeleteFeatures("OpsDataArchive_deletethis")
-    arcpy.management.Delete(NIFC_OpsDataArchive, "FeatureClass")
+    #Filter ops data based on feature category field and the delete field. Only the lines to keep are written so no features have to be deleted afterwards.
+    #The kept lines are written to memory, so every cleaning and QAQC pass over them runs without file geodatabase IO. Only the QAQC'd ops data is written to disk.
+    arcpy.analysis.Select(NIFC_OpsDataArchive,OpsData_Complt, "FeatureCategory IN ('Completed Burnout', 'Completed Dozer Line', 'Completed Fuel Break', 'Completed Hand Line', 'Completed Mixed Construction Line', 'Completed Plow Line', 'Completed Road as Line', 'Road as Completed Line') And (DeleteThis NOT IN ('Yes', 'Yes - Editing Mistake', 'Yes - No Longer Needed') Or DeleteThis IS NULL)")
+    #arcpy.analysis.Select(NIFC_OpsDataArchive,"OpsDataArchive_Complt", "FeatureCategory IN ('Completed Burnout', 'Completed Dozer Line', 'Completed Fuel Break', 'Completed Hand Line', 'Completed Mixed Construction Line', 'Completed Plow Line', 'Completed Road as Line', 'Road as Completed Line') And (DeleteThis NOT IN ('Yes - Editing Mistake', 'Yes - No Longer Needed') Or DeleteThis IS NULL) And FeatureStatus NOT IN ('Proposed') And FeatureStatus IS NOT NULL")
+    #A downloaded archive is removed with the fgdb it was unzipped into, so only one delete is needed either way
+    if DownloadOpsDataTrigger == "true":
+        arcpy.management.Delete(os.path.dirname(NIFC_OpsDataArchive)) #deleting the fgdb unzipped into the scratch folder
+    else:
+        arcpy.management.Delete(NIFC_OpsDataArchive, "FeatureClass")
     
 except:
-    arcpy.AddError("Error Filtering Data. Exiting.")
-    print("Error Filtering Data. Exiting.")
+    log("Error Filtering Data. Exiting.","error")
     report_error()
     sys.exit()
 '''This section of the code performs data cleaning on attribute fields, particularly for names and IRWIN ID fields,
 by removing accidental spaces and ensuring proper formatting of IRWIN IDs with braces.'''
 try:
-    arcpy.AddMessage("Cleaning NIFS Attribute Data")
-    print("Cleaning NIFS Attribute Data")
-    #PERIMETERS: Remove unwanted spaces before and after Incident name
-    arcpy.management.MakeFeatureLayer("HistFirePerims_"+FireYear, "FirePerims_nameformattingendwith", "attr_IncidentName LIKE '% '", None)
-    arcpy.management.CalculateField("FirePerims_nameformattingendwith", "attr_IncidentName", "!attr_IncidentName![:-1]", "PYTHON3", '', "TEXT", "NO_ENFORCE_DOMAINS")
-    arcpy.management.MakeFeatureLayer("HistFirePerims_"+FireYear, "FirePerims_nameformattingstartwith", "attr_IncidentName LIKE ' %'", None)
-    arcpy.management.CalculateField("FirePerims_nameformattingstartwith", "attr_IncidentName", "!attr_IncidentName![1:]", "PYTHON3", '', "TEXT", "NO_ENFORCE_DOMAINS")
+    log("Cleaning NIFS Attribute Data")
     # Check for existence of fields, and perform field calculations to populate missing fields if necessary
-    desc = arcpy.Describe("HistFirePerims_"+FireYear)
-    flds = desc.fields
-    fldin = 'no'
-    for fld in flds:
-        if fld.name =='poly_IRWINID':
-            fldin='yes'
-    if fldin == 'no':
+    #The field names are listed once and reused for both checks
+    existing_fields = {fld.name for fld in arcpy.ListFields("HistFirePerims_"+FireYear)}
+    if 'poly_IRWINID' not in existing_fields:
         arcpy.management.CalculateField("HistFirePerims_"+FireYear,"poly_IRWINID","!attr_IrwinID!","PYTHON3","","TEXT","NO_ENFORCE_DOMAINS")
-    desc = arcpy.Describe("HistFirePerims_"+FireYear)
-    flds = desc.fields
-    fldin = 'no'
-    for fld in flds:
-        if fld.name =='attr_POOState':
-            fldin='yes'
-    if fldin == 'no':
-        arcpy.analysis.PairwiseIntersect("HistFirePerims_"+FireYear+";"+USStates,"NIFC_WFIGS_Intersect","ALL",None,"INPUT")
-        arcpy.management.AddField("NIFC_WFIGS_Intersect","State_Area","DOUBLE",None,None,None,"","NULLABLE","NON_REQUIRED","")
-        arcpy.management.CalculateGeometryAttributes("NIFC_WFIGS_Intersect","State_Area AREA_GEODESIC","","SQUARE_METERS",None,"SAME_AS_INPUT")
-        arcpy.management.MakeFeatureLayer("NIFC_WFIGS_Intersect","NIFC_WFIGS_Intersect_Layer",'State_Area = (SELECT MAX("State_Area")FROM NIFC_WFIGS_Intersect)')
-        arcpy.management.JoinField("HistFirePerims_"+FireYear,"OBJECTID_1","NIFC_WFIGS_Intersect_Layer","FID_HistFirePerims_"+FireYear,"US_POO_State","NOT_USE_FM",None)
-        arcpy.management.CalculateField("HistFirePerims_"+FireYear,"attr_POOState","!US_POO_State!","PYTHON3","","TEXT","NO_ENFORCE_DOMAINS")
+    if 'attr_POOState' not in existing_fields:
+        if shapely is not None:
+            #Look up the state each perimeter falls in and write it with a single cursor pass
+            poo_states = find_poo_states("HistFirePerims_"+FireYear)
+            arcpy.management.AddField("HistFirePerims_"+FireYear,"attr_POOState","TEXT",None,None,None,"","NULLABLE","NON_REQUIRED","")
+            with arcpy.da.UpdateCursor("HistFirePerims_"+FireYear,["OID@","attr_POOState"]) as cursor:
+                for row in cursor:
+                    row[1] = poo_states.get(row[0])
+                    cursor.updateRow(row)
+        else:
+            arcpy.analysis.PairwiseIntersect("HistFirePerims_"+FireYear+";"+USStates,"NIFC_WFIGS_Intersect","ALL",None,"INPUT")
+            arcpy.management.AddField("NIFC_WFIGS_Intersect","State_Area","DOUBLE",None,None,None,"","NULLABLE","NON_REQUIRED","")
+            arcpy.management.CalculateGeometryAttributes("NIFC_WFIGS_Intersect","State_Area AREA_GEODESIC","","SQUARE_METERS",None,"SAME_AS_INPUT")
+            arcpy.management.MakeFeatureLayer("NIFC_WFIGS_Intersect","NIFC_WFIGS_Intersect_Layer",'State_Area = (SELECT MAX("State_Area")FROM NIFC_WFIGS_Intersect)')
+            arcpy.management.JoinField("HistFirePerims_"+FireYear,"OBJECTID_1","NIFC_WFIGS_Intersect_Layer","FID_HistFirePerims_"+FireYear,"US_POO_State","NOT_USE_FM",None)
+            arcpy.management.CalculateField("HistFirePerims_"+FireYear,"attr_POOState","!US_POO_State!","PYTHON3","","TEXT","NO_ENFORCE_DOMAINS")
 
-    #PERIMETERS: If the attr_IrwinID is null and the poly_irwinID is not null, then grab the IRWIN ID from that field.
-    arcpy.management.MakeFeatureLayer("HistFirePerims_"+FireYear, "UserInputFirePerims_blankattrirwin","poly_IRWINID IS NOT NULL And attr_IrwinID IS NULL")
-    arcpy.management.CalculateField("UserInputFirePerims_blankattrirwin","attr_IrwinID","!poly_IRWINID!")
-    #PERIMETERS: Remove unwanted spaces before and after IRWIN ID
-    arcpy.management.MakeFeatureLayer("HistFirePerims_"+FireYear, "HistFirePerims_IRWINendswith", "attr_IrwinID LIKE '% '", None)
-    arcpy.management.CalculateField("HistFirePerims_IRWINendswith", "attr_IrwinID", "!attr_IrwinID![:-1]", "PYTHON3", '', "TEXT", "NO_ENFORCE_DOMAINS")
-    arcpy.management.MakeFeatureLayer("HistFirePerims_"+FireYear, "HistFirePerims_IRWINstartswith", "attr_IrwinID LIKE ' %'", None)
-    arcpy.management.CalculateField("HistFirePerims_IRWINstartswith", "attr_IrwinID", "!attr_IrwinID![1:]", "PYTHON3", '', "TEXT", "NO_ENFORCE_DOMAINS")
-    #PERIMETERS: Capitalize all Incident names the same way since comparison and Dissolve accounts for differences
-    arcpy.management.CalculateField("HistFirePerims_"+FireYear, "attr_IncidentName", "(!attr_IncidentName!).title()", "PYTHON3", '', "TEXT", "NO_ENFORCE_DOMAINS")
+    #PERIMETERS: Remove unwanted spaces before and after Incident name and IRWIN ID in a single cursor pass. strip() removes every leading/trailing space at once.
+    #If the attr_IrwinID is null and the poly_irwinID is not null, then grab the IRWIN ID from that field.
+    #Capitalize all Incident names the same way since comparison and Dissolve accounts for differences, and IRWIN IDs as later comparisons are case sensitive.
+    with arcpy.da.UpdateCursor("HistFirePerims_"+FireYear,["attr_IncidentName","attr_IrwinID","poly_IRWINID"]) as cursor:
+        for row in cursor:
+            if row[0]:
+                row[0] = row[0].strip().title()
+            if row[1] is None and row[2] is not None:
+                row[1] = row[2]
+            if row[1]:
+                row[1] = row[1].strip().upper()
+            cursor.updateRow(row)
     #Ops Data
-    #OPS: Remove unwanted spaces before and after Incident name. The "get count" will figure out if spaces are still present after removing one that need to be deleted.
-    arcpy.management.MakeFeatureLayer("OpsDataArchive_Complt", "OpsDataArchive_nameendswith", "IncidentName LIKE '% '", None)
-    arcpy.management.CalculateField("OpsDataArchive_nameendswith", "IncidentName", "!IncidentName![:-1]", "PYTHON3", '', "TEXT", "NO_ENFORCE_DOMAINS")
-    result = arcpy.GetCount_management("OpsDataArchive_nameendswith")
-    count = int(result.getOutput(0))
-    if count > 0:
-        arcpy.management.CalculateField("OpsDataArchive_nameendswith", "IncidentName", "!IncidentName![:-1]", "PYTHON3", '', "TEXT", "NO_ENFORCE_DOMAINS")
-    arcpy.management.MakeFeatureLayer("OpsDataArchive_Complt", "OpsDataArchive_namebeginswith", "IncidentName LIKE ' %'", None)
-    arcpy.management.CalculateField("OpsDataArchive_namebeginswith", "IncidentName", "!IncidentName![1:]", "PYTHON3", '', "TEXT", "NO_ENFORCE_DOMAINS")
-    result = arcpy.GetCount_management("OpsDataArchive_namebeginswith")
-    count = int(result.getOutput(0))
-    if count > 0:
-        arcpy.management.CalculateField("OpsDataArchive_namebeginswith", "IncidentName", "!IncidentName![1:]", "PYTHON3", '', "TEXT", "NO_ENFORCE_DOMAINS")
-    #Capitalize all Incident names the same way since comparison accounts for case differences
-    arcpy.management.CalculateField("OpsDataArchive_Complt", "IncidentName", "(!IncidentName!).title()", "PYTHON3", '', "TEXT", "NO_ENFORCE_DOMAINS")
-    #Capitalize everything in the IRWIN ID field as later comparisons are case sensitive.
-    arcpy.management.CalculateField("OpsDataArchive_Complt","IRWINID","!IRWINID!.upper()","PYTHON3","","TEXT","NO_ENFORCE_DOMAINS")
-    #Remove unwanted spaces before and after IRWIN ID. This is more thorough than IncName as more errors were seen here.
-    arcpy.management.MakeFeatureLayer("OpsDataArchive_Complt", "OpsData_irwinbeginswith", "IRWINID LIKE ' %'", None)
-    arcpy.management.CalculateField("OpsData_irwinbeginswith", "IRWINID", "!IRWINID![1:]", "PYTHON3", '', "TEXT", "NO_ENFORCE_DOMAINS")
-    result = arcpy.GetCount_management("OpsData_irwinbeginswith")
-    count = int(result.getOutput(0))
-    if count > 0:
-        arcpy.management.CalculateField("OpsData_irwinbeginswith", "IRWINID", "!IRWINID![1:]", "PYTHON3", '', "TEXT", "NO_ENFORCE_DOMAINS")
-    result = arcpy.GetCount_management("OpsData_irwinbeginswith")
-    count = int(result.getOutput(0))
-    if count > 0:
-        arcpy.management.CalculateField("OpsData_irwinbeginswith", "IRWINID", "!IRWINID![1:]", "PYTHON3", '', "TEXT", "NO_ENFORCE_DOMAINS")
-    #after IRWIN ID
-    arcpy.management.MakeFeatureLayer("OpsDataArchive_Complt", "OpsData_irwinendswith", "IRWINID LIKE '% '", None)
-    arcpy.management.CalculateField("OpsData_irwinendswith", "IRWINID", "!IRWINID![:-1]", "PYTHON3", '', "TEXT", "NO_ENFORCE_DOMAINS")
-    result = arcpy.GetCount_management("OpsData_irwinendswith")
-    count = int(result.getOutput(0))
-    if count > 0:
-        arcpy.management.CalculateField("OpsData_irwinendswith", "IRWINID", "!IRWINID![:-1]", "PYTHON3", '', "TEXT", "NO_ENFORCE_DOMAINS")
-    result = arcpy.GetCount_management("OpsData_irwinendswith")
-    count = int(result.getOutput(0))
-    if count > 0:
-        arcpy.management.CalculateField("OpsData_irwinendswith", "IRWINID", "!IRWINID![:-1]", "PYTHON3", '', "TEXT", "NO_ENFORCE_DOMAINS")
-    #Clean up Ops irwin ID field to acount for missing brackets
-    arcpy.management.AddField("OpsDataArchive_Complt", "EditedOPS_IRWINID", "TEXT", None, None, None, None, "NULLABLE", "NON_REQUIRED", None)
-    arcpy.management.CalculateField("OpsDataArchive_Complt", "EditedOPS_IRWINID", "reclass(!IRWINID!)", "PYTHON3", """def reclass(IRWINID):
-        if IRWINID is None:
-            return None
-        elif not IRWINID.startswith("{"):
-            return "{" + IRWINID + "}"
-        else:
-            return IRWINID""", "TEXT", "NO_ENFORCE_DOMAINS")
-    arcpy.management.CalculateField("OpsDataArchive_Complt", "IRWINID", "!EditedOPS_IRWINID!", "PYTHON3", '', "TEXT", "NO_ENFORCE_DOMAINS")
-    arcpy.management.DeleteField("OpsDataArchive_Complt", "EditedOPS_IRWINID")
-    #If IRWIN ID does not meet string character threshold then set to NULL. This erases the "uh", "what", and other invalid IRWIN IDS.
-    arcpy.management.MakeFeatureLayer("OpsDataArchive_Complt", "OpsDataArchive_IRWINCharlength", 'CHAR_LENGTH("IRWINID") < 36 OR CHAR_LENGTH("IRWINID") > 40', None)
-    arcpy.management.CalculateField("OpsDataArchive_IRWINCharlength", "IRWINID", "None", "PYTHON3", '', "TEXT", "NO_ENFORCE_DOMAINS")
+    #OPS: Remove unwanted spaces before and after Incident name and IRWIN ID in a single cursor pass.
+    #Capitalize all Incident names the same way since comparison accounts for case differences, and everything in the IRWIN ID field as later comparisons are case sensitive.
+    #IRWIN IDs are then checked against the GUID pattern and wrapped in the brackets they are missing. Anything else is set to NULL, which erases the "uh", "what", and other invalid IRWIN IDS.
+    irwin_pattern = re.compile(r"[0-9A-F-]{36}")
+    with arcpy.da.UpdateCursor(OpsData_Complt,["IncidentName","IRWINID"]) as cursor:
+        for row in cursor:
+            if row[0]:
+                row[0] = row[0].strip().title()
+            if row[1] is not None:
+                irwin = row[1].strip().upper().strip("{}")
+                row[1] = "{"+irwin+"}" if irwin_pattern.fullmatch(irwin) else None
+            cursor.updateRow(row)
 except:
-    arcpy.AddError("Error creating subset of ops and fire perimeter data. Exiting.")
-    print("Error creating subset of ops and fire perimeter data. Exiting.")
+    log("Error creating subset of ops and fire perimeter data. Exiting.","error")
     report_error()
     sys.exit()
 
 # This section of the code adds a field to operational data to assign a priority ranking based on the feature category.
 try:
-    arcpy.AddMessage("Adding Field to Rank Fireline Prioritization")
-    print("Adding Field to Rank Fireline Prioritization")
-    arcpy.management.AddField("OpsDataArchive_Complt","FirelineCatPrioritizationAsgn","LONG",None,None,None,"","NULLABLE","NON_REQUIRED","")
-    # Calculate the prioritization weight based on the FeatureCategory using a defined reclassification function
-    arcpy.management.CalculateField("OpsDataArchive_Complt","FirelineCatPrioritizationAsgn","Reclass(!FeatureCategory!)","PYTHON3",
-    """def Reclass(FeatureCategory):
-    if FeatureCategory =='Completed Road as Line':
-        return 1
-    elif FeatureCategory =='Road as Completed Line':
-        return 1
-    elif FeatureCategory =='Completed Dozer Line':
-        return 2
-    elif FeatureCategory =='Completed Hand Line':
-        return 3
-    elif FeatureCategory =='Completed Mixed Construction Line':
-        return 4
-    elif FeatureCategory =='Completed Fuel Break':
-        return 5
-    elif FeatureCategory =='Completed Burnout':
-        return 6
-    elif FeatureCategory =='Completed Plow Line':
-        return 7
-    elif FeatureCategory is None:
-        return None
-    else: 
-        return 1000""","TEXT","NO_ENFORCE_DOMAINS")    
+    log("Adding Field to Rank Fireline Prioritization")
+    #All fields the QAQC adds to the ops data are created together in one schema change. They carry through projection into the final ops data.
+    arcpy.management.AddFields(OpsData_Complt,[["FirelineCatPrioritizationAsgn","LONG"],["OrigOID_Link","TEXT"],["QueryComparison","TEXT"],["OldIRWIN","TEXT"],["OldName","TEXT"]])
+    # Calculate the prioritization weight based on the FeatureCategory with a dictionary lookup in a single cursor pass. Unlisted categories get 1000.
+    FirelineCatPrioritization = {
+        'Completed Road as Line': 1,
+        'Road as Completed Line': 1,
+        'Completed Dozer Line': 2,
+        'Completed Hand Line': 3,
+        'Completed Mixed Construction Line': 4,
+        'Completed Fuel Break': 5,
+        'Completed Burnout': 6,
+        'Completed Plow Line': 7,
+    }
+    with arcpy.da.UpdateCursor(OpsData_Complt,["FeatureCategory","FirelineCatPrioritizationAsgn"]) as cursor:
+        for row in cursor:
+            row[1] = None if row[0] is None else FirelineCatPrioritization.get(row[0], 1000)
+            cursor.updateRow(row)
 except:
-    arcpy.AddError("Error adding field to attribute fireline prioritization. Exiting.")
-    print("Error adding field to attribute fireline prioritization. Exiting.")
+    log("Error adding field to attribute fireline prioritization. Exiting.","error")
     report_error()
     sys.exit()
 
 # This part of the script prepares the fire data by projecting it to a standard coordinate system and repairing any geometry issues.
 try:
-    arcpy.AddMessage("Preprocessing Fire Data")
-    print("Preprocessing Fire data")
-    #Project Perimeters if needed
+    log("Preprocessing Fire Data")
+    #Project Perimeters if needed. Data already in GCS_WGS_1984 (the NIFC downloads are requested in 4326) is renamed rather than copied.
+    #The output spatial reference is created once and shared by both datasets
+    wgs84_sr = arcpy.SpatialReference(4326)
     fireperimproj = arcpy.Describe("HistFirePerims_"+FireYear).SpatialReference.factoryCode
-    if fireperimproj != 4326:
-        print ("Changing Projection of Perimeters to GCS_WGS_1984")
-        arcpy.AddMessage("Changing Projection of Perimeters to GCS_WGS_1984")
-        arcpy.management.Project("HistFirePerims_"+FireYear,final_Hist_fire_perimeters, arcpy.SpatialReference(4326))
+    if fireperimproj != wgs84_sr.factoryCode:
+        log("Changing Projection of Perimeters to GCS_WGS_1984")
+        arcpy.management.Project("HistFirePerims_"+FireYear,final_Hist_fire_perimeters, wgs84_sr)
+        arcpy.management.Delete("HistFirePerims_"+FireYear, "FeatureClass")
     else:
-        arcpy.management.CopyFeatures("HistFirePerims_"+FireYear,final_Hist_fire_perimeters)
-    #Project Ops data if needed
-    opsdataproj = arcpy.Describe("OpsDataArchive_Complt").SpatialReference.factoryCode
-    if opsdataproj != 4326:
-        print ("Changing Projection of Ops Data to GCS_WGS_1984")
-        arcpy.AddMessage("Changing Projection of Ops Data to GCS_WGS_1984")
-        arcpy.management.Project("OpsDataArchive_Complt",final_OpsDataArchive, arcpy.SpatialReference(4326))
+        arcpy.management.Rename("HistFirePerims_"+FireYear,final_Hist_fire_perimeters)
+    #Project Ops data if needed. The ops data stays in memory either way.
+    opsdataproj = arcpy.Describe(OpsData_Complt).SpatialReference.factoryCode
+    if opsdataproj != wgs84_sr.factoryCode:
+        log("Changing Projection of Ops Data to GCS_WGS_1984")
+        #Project does not write to the memory workspace, so the projected lines go to the scratch geodatabase and are copied back into memory
+        projected_ops = os.path.join(scratchworkspace,"OpsDataArchive_Proj")
+        arcpy.management.Project(OpsData_Complt,projected_ops, wgs84_sr)
+        ################Comment this line out if you want all filtered firelines for the year################
+        arcpy.management.Delete(OpsData_Complt, "FeatureClass")
+        final_OpsDataArchive = os.path.join(memoryws,final_OpsDataArchive)
+        arcpy.management.CopyFeatures(projected_ops,final_OpsDataArchive)
+        arcpy.management.Delete(projected_ops)
     else:
-        arcpy.management.CopyFeatures("OpsDataArchive_Complt",final_OpsDataArchive)
-    arcpy.management.Delete("HistFirePerims_"+FireYear, "FeatureClass")
-
-    ################Comment this line out if you want all filtered firelines for the year################
-    arcpy.management.Delete("OpsDataArchive_Complt", "FeatureClass")
+        final_OpsDataArchive = OpsData_Complt
     
     #Repair Geometry and deletes null geometry features
     arcpy.RepairGeometry_management(final_Hist_fire_perimeters,"DELETE_NULL")
     arcpy.RepairGeometry_management(final_OpsDataArchive,"DELETE_NULL")
     #Add new field to calculate geodesic acreage for filtering
     arcpy.management.AddField(final_Hist_fire_perimeters, "Geodesic_Acreage", "DOUBLE", None, None, None, None, "NULLABLE", "NON_REQUIRED", None)
-    arcpy.management.CalculateField(final_Hist_fire_perimeters, "Geodesic_Acreage", "!shape.geodesicArea@acres!", "PYTHON_9.3", None)
+    with arcpy.da.UpdateCursor(final_Hist_fire_perimeters, ["SHAPE@", "Geodesic_Acreage"]) as cursor:
+        for row in cursor:
+            row[1] = row[0].getArea("GEODESIC", "ACRES")
+            cursor.updateRow(row)
     #Announce Completion and final feature class name:
-    arcpy.AddMessage("Preprocessing: Repairing Geometry and Projecting data completed")
-    print("Preprocessing: Repairing Geometry and Projecting data completed")
+    log("Preprocessing: Repairing Geometry and Projecting data completed")
 except:
-    arcpy.AddError("Error Preprocessing the NIFC data. Exiting.")
-    print("Error Preprocessing the NIFC data. Exiting.")
+    log("Error Preprocessing the NIFC data. Exiting.","error")
     report_error()
     sys.exit()
 
 #This section compares IRWIN IDs, Incident name, and POO (point of Orig) of perimeters and firelines.
 #This is done to grab all lines outside of buffer area if they have the same IRWIN ID and/or attribute them to the fire if they have the same incident name within the same POO state
 try:
-    arcpy.management.CopyFeatures(final_Hist_fire_perimeters,(os.path.join(scratchworkspace,"FirePerimsForQuery")))
-    queryperims = os.path.join(scratchworkspace,"FirePerimsForQuery")
-    #Adds field to track Object ID for query table join when comparing attributes later
-    arcpy.management.AddField(final_OpsDataArchive,"OrigOID_Link","TEXT",)
+    #Track Object ID for matching lines to perimeters when comparing attributes later
     arcpy.management.CalculateField(final_OpsDataArchive,"OrigOID_Link","!OBJECTID!",)
+    with arcpy.da.SearchCursor(final_Hist_fire_perimeters,["attr_IrwinID","attr_IncidentName","attr_POOState"]) as cursor:
+        perims = pd.DataFrame(list(cursor),columns=["attr_IrwinID","attr_IncidentName","attr_POOState"])
+    #Every line can match a perimeter on IRWIN ID wherever it lies
+    with arcpy.da.SearchCursor(final_OpsDataArchive,["IRWINID","OrigOID_Link","IncidentName"]) as cursor:
+        lines = pd.DataFrame(list(cursor),columns=["IRWINID","OrigOID_Link","IncidentName"])
+    #Match lines to perimeters with the same IRWIN ID, or the same Incident name within the same POO state, using hash joins in memory. Null values never match, as in SQL.
+    irwin_matches = lines.dropna(subset=["IRWINID"]).merge(perims.dropna(subset=["attr_IrwinID"]),left_on="IRWINID",right_on="attr_IrwinID")
     #Intersect with States in order to ID lines that have the same name as the perimeter that fall within the same state.
-    arcpy.analysis.PairwiseIntersect(final_OpsDataArchive+";"+USStates,(os.path.join(scratchworkspace,"OpsLineStatesInt")))
-    # Create a query table for joining features based on multiple fields
-    opsstateint = os.path.join(scratchworkspace,"OpsLineStatesInt")
-    queryperims = os.path.join(scratchworkspace,"FirePerimsForQuery")
-    arcpy.management.MakeQueryTable(queryperims+";"+opsstateint,"Qrytbl","USE_KEY_FIELDS",None,
-    in_field="OpsLineStatesInt.IRWINID #;OpsLineStatesInt.OrigOID_Link #;OpsLineStatesInt.US_POO_State #;OpsLineStatesInt.IncidentName #;FirePerimsForQuery.attr_IrwinID #;FirePerimsForQuery.attr_IncidentName #;FirePerimsForQuery.attr_POOState #",
-    where_clause="FirePerimsForQuery.attr_IrwinID = OpsLineStatesInt.IRWINID Or FirePerimsForQuery.attr_IncidentName = OpsLineStatesInt.IncidentName And FirePerimsForQuery.attr_POOState = OpsLineStatesInt.US_POO_State")
-    #Export table for processing
-    arcpy.conversion.ExportTable("Qrytbl","Qrytbl_expt")
-    #Add field to hold comparison notes
-    arcpy.management.AddField("Qrytbl_expt","QueryComparison","TEXT")
-    #conditionally fill comparison field
-    arcpy.management.CalculateField("Qrytbl_expt","QueryComparison",
-        expression="Reclass(!IRWINID!,!IncidentName!,!attr_IrwinID!,!attr_IncidentName!,!US_POO_State!,!attr_POOState!)",
-        expression_type="PYTHON3",
-        code_block="""def Reclass(IRWINID,IncidentName,attr_IrwinID,attr_IncidentName,US_POO_State,attr_POOState):
-        if IRWINID == attr_IrwinID and IncidentName == attr_IncidentName:
-            return "Has Matching IRWIN and Name"
-        elif IRWINID == attr_IrwinID:
-            return "Has Matching IRWIN ID. Name Taken From Matching IRWIN"
-        elif IncidentName == attr_IncidentName and US_POO_State == attr_POOState:
-            return "Has Matching Inc Name in Same State. IRWIN Taken From Matching Name"
-        else: 
-            return "None" """)
-    #Join back to OG lines
-    arcpy.management.JoinField(final_OpsDataArchive,"OrigOID_Link","Qrytbl_expt","OrigOID_Link","QueryComparison;attr_IrwinID;attr_IncidentName","NOT_USE_FM",None)
-    #Populate Fields accordingly
-    #Create a field to hold old overwritten IRWIN IDs
-    arcpy.management.AddField(final_OpsDataArchive,"OldIRWIN",field_type="TEXT")
-    arcpy.management.MakeFeatureLayer(final_OpsDataArchive,"Irwintrackinglayer","QueryComparison = 'Has Matching Inc Name in Same State. IRWIN Taken From Matching Name' And IRWINID IS NOT NULL")
-    arcpy.management.CalculateField("Irwintrackinglayer","OldIRWIN","!IRWINID!")
-    arcpy.management.MakeFeatureLayer(final_OpsDataArchive,"Irwinchange","QueryComparison = 'Has Matching Inc Name in Same State. IRWIN Taken From Matching Name'")
-    arcpy.management.CalculateField("Irwinchange","IRWINID","!attr_IrwinID!")
-    #Attribute names correctly based off perimeter attributes
-    arcpy.management.AddField(final_OpsDataArchive,"OldName","TEXT")
-    arcpy.management.MakeFeatureLayer(final_OpsDataArchive,"Nametrackingchange","QueryComparison = 'Has Matching IRWIN ID. Name Taken From Matching IRWIN' And IncidentName IS NOT NULL",)
-    arcpy.management.CalculateField("Nametrackingchange","OldName","!IncidentName!")
-    arcpy.management.MakeFeatureLayer(final_OpsDataArchive,"Namechange","QueryComparison = 'Has Matching IRWIN ID. Name Taken From Matching IRWIN'")
-    arcpy.management.CalculateField("Namechange","IncidentName","!attr_IncidentName!")
-    #Clean up workspace and features
-    arcpy.management.Delete((os.path.join(scratchworkspace,"FirePerimsForQuery")), "FeatureClass")
-    arcpy.management.Delete((os.path.join(scratchworkspace,"OpsLineStatesInt")), "FeatureClass")
-    arcpy.management.Delete("Qrytbl_expt")
-    arcpy.management.DeleteField(final_OpsDataArchive,"attr_IrwinID;attr_IncidentName","DELETE_FIELDS")
+    #A name match only counts for lines without an IRWIN match, and only for the names and POO states of the perimeters, so the state lookup is limited to those lines and states.
+    perim_names = perims.dropna(subset=["attr_IncidentName","attr_POOState"])
+    perim_states = set(perim_names["attr_POOState"])
+    name_lines = set(lines["IncidentName"].dropna()) & set(perim_names["attr_IncidentName"])
+    if not name_lines:
+        line_states = []
+    else:
+        name_clause = "IncidentName IN ("+",".join("'"+name.replace("'","''")+"'" for name in sorted(name_lines))+")"
+        if shapely is not None:
+            #The states each line crosses are looked up with the same state STRtree as the perimeters. No intersection geometry is built.
+            line_states = [row for row in find_line_states(final_OpsDataArchive,name_clause) if row[2] in perim_states]
+        else:
+            arcpy.management.MakeFeatureLayer(final_OpsDataArchive,"NameMatchLines",name_clause)
+            arcpy.management.MakeFeatureLayer(USStates,"POOStates","US_POO_State IN ("+",".join("'"+state.replace("'","''")+"'" for state in sorted(perim_states))+")")
+            opsstateint = os.path.join(memoryws,"OpsLineStatesInt")
+            arcpy.analysis.PairwiseIntersect("NameMatchLines;POOStates",opsstateint)
+            with arcpy.da.SearchCursor(opsstateint,["IRWINID","OrigOID_Link","US_POO_State","IncidentName"]) as cursor:
+                line_states = list(cursor)
+    line_states = pd.DataFrame(line_states,columns=["IRWINID","OrigOID_Link","US_POO_State","IncidentName"])
+    line_states = line_states[~line_states["OrigOID_Link"].isin(irwin_matches["OrigOID_Link"])]
+    name_matches = line_states.dropna(subset=["IncidentName","US_POO_State"]).merge(perims.dropna(subset=["attr_IncidentName","attr_POOState"]),left_on=["IncidentName","US_POO_State"],right_on=["attr_IncidentName","attr_POOState"])
+    matches = pd.concat([irwin_matches,name_matches],ignore_index=True)
+    #Comparison notes in order of preference. A line that matches more than one perimeter keeps its best match.
+    comparisons = ["Has Matching IRWIN and Name","Has Matching IRWIN ID. Name Taken From Matching IRWIN","Has Matching Inc Name in Same State. IRWIN Taken From Matching Name"]
+    irwin_match = matches["IRWINID"] == matches["attr_IrwinID"]
+    name_match = matches["IncidentName"] == matches["attr_IncidentName"]
+    matches["Comparison"] = np.select([irwin_match & name_match, irwin_match],[0,1],2)
+    matches = matches.sort_values("Comparison",kind="stable").drop_duplicates("OrigOID_Link")
+    matches = matches.astype(object).where(matches.notna(),None)
+    matched = {link: (comparisons[comparison],irwin,name) for link, comparison, irwin, name in zip(matches["OrigOID_Link"],matches["Comparison"],matches["attr_IrwinID"],matches["attr_IncidentName"])}
+    #Note the comparison, keep the old value, and attribute IRWIN IDs and names correctly based off perimeter attributes in one cursor pass
+    with arcpy.da.UpdateCursor(final_OpsDataArchive,["OrigOID_Link","QueryComparison","IRWINID","IncidentName","OldIRWIN","OldName"]) as cursor:
+        for row in cursor:
+            if row[0] not in matched:
+                continue
+            row[1], perim_irwin, perim_name = matched[row[0]]
+            if row[1] == comparisons[2]:
+                if row[2] is not None:
+                    row[4] = row[2]
+                row[2] = perim_irwin
+            elif row[1] == comparisons[1]:
+                if row[3] is not None:
+                    row[5] = row[3]
+                row[3] = perim_name
+            cursor.updateRow(row)
 except:
-    arcpy.AddError("Error Comparing Attributes. Exiting.")
-    print("Error Comparing Attributes. Exiting.")
+    log("Error Comparing Attributes. Exiting.","error")
     report_error()
     sys.exit()
 
@@ -562,77 +550,57 @@ except:
 # This section applies quality control to fire operations data based on proximity to fire perimeters.
 # It ensures that features are correctly attributed even if they don't have matching names or IRWIN IDs but are within a buffer of a fire perimeter.
 try:
-    #Select data that was not identified as part of the fire through attribution
-    arcpy.management.MakeFeatureLayer(final_OpsDataArchive,"OpsData_comparison_attr","QueryComparison IS NOT NULL")
-    # Export identified features and remove them from the buffer selection process
-    arcpy.conversion.ExportFeatures("OpsData_comparison_attr","OpsData_attrcompare")
-    arcpy.management.DeleteFeatures("OpsData_comparison_attr")
-    arcpy.AddMessage("Buffering Fire Perimeters to Select FireLines to be Included That Don't Have Matching Attribution")
-    print("Buffering Fire Perimeters to Select FireLines to be Included That Don't Have Matching Attribution")
-    # Buffer the fire perimeters
-    arcpy.analysis.PairwiseBuffer(final_Hist_fire_perimeters,"FirePerimsBuffer",PerimBufferIntersect+" Meters","NONE",None,"GEODESIC","0 DecimalDegrees")
-    # Remove features outside of the buffer
-    arcpy.management.MakeFeatureLayer(final_OpsDataArchive, "OpsDataArchive_layerforNo")
-    arcpy.management.SelectLayerByLocation("OpsDataArchive_layerforNo", "INTERSECT", "FirePerimsBuffer", None, "NEW_SELECTION", "INVERT")
-    arcpy.management.DeleteFeatures("OpsDataArchive_layerforNo")
+    #Features identified as part of the fire through attribution already have a QueryComparison note. They stay in place and are left out of the buffer selection process.
+    log("Buffering Fire Perimeters to Select FireLines to be Included That Don't Have Matching Attribution")
+    if shapely is not None:
+        # Remove features without matching attribution that are not within the buffer distance of a fire perimeter
+        nearby = find_features_within(final_OpsDataArchive,final_Hist_fire_perimeters,float(PerimBufferIntersect))
+        with arcpy.da.UpdateCursor(final_OpsDataArchive,["OID@"],"QueryComparison IS NULL") as cursor:
+            for row in cursor:
+                if row[0] not in nearby:
+                    cursor.deleteRow()
+    else:
+        # Buffer the fire perimeters
+        arcpy.analysis.PairwiseBuffer(final_Hist_fire_perimeters,os.path.join(memoryws,"FirePerimsBuffer"),PerimBufferIntersect+" Meters","NONE",None,"GEODESIC","0 DecimalDegrees")
+        # Remove features without matching attribution outside of the buffer
+        arcpy.management.MakeFeatureLayer(final_OpsDataArchive, "OpsDataArchive_layerforNo","QueryComparison IS NULL")
+        arcpy.management.SelectLayerByLocation("OpsDataArchive_layerforNo", "INTERSECT", os.path.join(memoryws,"FirePerimsBuffer"), None, "NEW_SELECTION", "INVERT")
+        arcpy.management.DeleteFeatures("OpsDataArchive_layerforNo")
     #Grab the largest fire of the user provided perimeters (complex) to then attribute IRWIN ID and Inc Name to the firelines that reside within the buffer area
-    arcpy.management.MakeTableView(final_Hist_fire_perimeters,"UserInputFirePerims","Geodesic_Acreage = (SELECT MAX(Geodesic_Acreage) FROM "+final_Hist_fire_perimeters+")")
-    arcpy.conversion.ExportTable("UserInputFirePerims","LrgestFireAcrg_ForNamingFL")
-    #Create a common field in both feature classes for the attributes to join on
-    arcpy.management.CalculateField("LrgestFireAcrg_ForNamingFL","Flag",'"Name and IRWIN taken from largest perim. Did not have matching attributes but intersected buffer."',"PYTHON3","","TEXT","NO_ENFORCE_DOMAINS")
-    arcpy.management.CalculateField(final_OpsDataArchive,"Flag",'"Name and IRWIN taken from largest perim. Did not have matching attributes but intersected buffer."',"PYTHON3","","TEXT","NO_ENFORCE_DOMAINS")
-    arcpy.management.JoinField(final_OpsDataArchive,"Flag","LrgestFireAcrg_ForNamingFL","Flag","attr_IncidentName;attr_IrwinID","NOT_USE_FM",None)
-    #Populate QueryComparison notes field based on IRWIN and Inc Name
-    arcpy.management.CalculateField(final_OpsDataArchive,"QueryComparison","Reclass(!QueryComparison!,!IncidentName!,!IRWINID!)","PYTHON3",
-        """def Reclass(QueryComparison,IncidentName,IRWINID):
-        if (IncidentName is None and IRWINID is None):
-            return "Within Buffer but Both Inc Name and IRWIN Null. Both Changed to Match Largest Perim"
-        elif (IRWINID is None and IncidentName is not None):
-            return "Within Buffer but IRWIN Null. Both Changed to Match Largest Perim"
-        elif (IRWINID is not None and IncidentName is None):
-            return "Within Buffer but Inc Name Null. Both Changed to Match Largest Perim"
-        elif (IRWINID is not None and IncidentName is not None):
-            return "Within Buffer but Both Inc Name and IRWIN Didnt Match. Both Changed to Match Largest Perim"
-        else: 
-            return "Did not match query. Error." """)
-    #Populate fields accordingly
-    #Both Null
-    arcpy.management.MakeFeatureLayer(final_OpsDataArchive,"OpsData_BothNull","QueryComparison = 'Within Buffer but Both Inc Name and IRWIN Null. Both Changed to Match Largest Perim'")
-    arcpy.management.CalculateField("OpsData_BothNull","IRWINID","!attr_IrwinID!")
-    arcpy.management.CalculateField("OpsData_BothNull","IncidentName","!attr_IncidentName!")
-    #IRWIN Null
-    arcpy.management.MakeFeatureLayer(final_OpsDataArchive,"OpsData_irwinNull","QueryComparison = 'Within Buffer but IRWIN Null. Both Changed to Match Largest Perim'")
-    arcpy.management.CalculateField("OpsData_irwinNull","OldName","!IncidentName!")
-    arcpy.management.CalculateField("OpsData_irwinNull","IncidentName","!attr_IncidentName!")
-    arcpy.management.CalculateField("OpsData_irwinNull","IRWINID","!attr_IrwinID!")
-    #Inc Name Null
-    arcpy.management.MakeFeatureLayer(final_OpsDataArchive,"OpsData_nameNull","QueryComparison = 'Within Buffer but Inc Name Null. Both Changed to Match Largest Perim'")
-    arcpy.management.CalculateField("OpsData_nameNull","OldIRWIN","!IRWINID!")
-    arcpy.management.CalculateField("OpsData_nameNull","IncidentName","!attr_IncidentName!")
-    arcpy.management.CalculateField("OpsData_nameNull","IRWINID","!attr_IrwinID!")
-    #Both didnt match
-    arcpy.management.MakeFeatureLayer(final_OpsDataArchive,"OpsData_nomatch","QueryComparison = 'Within Buffer but Both Inc Name and IRWIN Didnt Match. Both Changed to Match Largest Perim'")
-    arcpy.management.CalculateField("OpsData_nomatch","OldIRWIN","!IRWINID!")
-    arcpy.management.CalculateField("OpsData_nomatch","OldName","!IncidentName!")
-    arcpy.management.CalculateField("OpsData_nomatch","IncidentName","!attr_IncidentName!")
-    arcpy.management.CalculateField("OpsData_nomatch","IRWINID","!attr_IrwinID!")
-    #this line saves the QAQCed ops data
-    arcpy.management.Merge(final_OpsDataArchive+";OpsData_attrcompare",QAQCd_OpsData)
-    arcpy.Delete_management(final_OpsDataArchive)
-    arcpy.management.DeleteField(QAQCd_OpsData,"OrigOID_Link;Flag;attr_IncidentName;attr_IrwinID","DELETE_FIELDS")
+    with arcpy.da.SearchCursor(final_Hist_fire_perimeters,["attr_IncidentName","attr_IrwinID"],sql_clause=(None,"ORDER BY Geodesic_Acreage DESC")) as cursor:
+        lrgst_name, lrgst_irwin = next(cursor)
+    #Populate QueryComparison notes field based on IRWIN and Inc Name, keep the old values, and attribute the largest perimeter's name and IRWIN ID in one cursor pass
+    with arcpy.da.UpdateCursor(final_OpsDataArchive,["QueryComparison","IncidentName","IRWINID","OldName","OldIRWIN"],"QueryComparison IS NULL") as cursor:
+        for row in cursor:
+            if row[1] is None and row[2] is None:
+                row[0] = "Within Buffer but Both Inc Name and IRWIN Null. Both Changed to Match Largest Perim"
+            elif row[2] is None:
+                row[0] = "Within Buffer but IRWIN Null. Both Changed to Match Largest Perim"
+                row[3] = row[1]
+            elif row[1] is None:
+                row[0] = "Within Buffer but Inc Name Null. Both Changed to Match Largest Perim"
+                row[4] = row[2]
+            else:
+                row[0] = "Within Buffer but Both Inc Name and IRWIN Didnt Match. Both Changed to Match Largest Perim"
+                row[3] = row[1]
+                row[4] = row[2]
+            row[1] = lrgst_name
+            row[2] = lrgst_irwin
+            cursor.updateRow(row)
+    arcpy.management.DeleteField(final_OpsDataArchive,"OrigOID_Link","DELETE_FIELDS")
     #Calculate the Line Length in KM to ID potential faulty data
-    arcpy.management.CalculateGeometryAttributes(QAQCd_OpsData,"LineLengthGeodesicKM LENGTH_GEODESIC","KILOMETERS","",None,"SAME_AS_INPUT")
+    arcpy.management.AddField(final_OpsDataArchive,"LineLengthGeodesicKM","DOUBLE")
+    with arcpy.da.UpdateCursor(final_OpsDataArchive,["SHAPE@","LineLengthGeodesicKM"]) as cursor:
+        for row in cursor:
+            row[1] = row[0].getLength("GEODESIC","KILOMETERS") if row[0] else None
+            cursor.updateRow(row)
+    #this line saves the QAQCed ops data. The attribute matched and buffered lines are already together, so they are written to disk in one export.
+    arcpy.conversion.ExportFeatures(final_OpsDataArchive,QAQCd_OpsData)
     #We no longer keep a simplified/dissolved final ops archive as most firelines attributed to a few require QAQC. If user wants simplified firelines, use tool 2B.
-    arcpy.management.Delete(final_OpsDataArchive)
-    #Clean up workspace
-    fc_Delete = ["FirePerimsBuffer","LrgestFireAcrg_ForNamingFL","OpsData_attrcompare"]
-    for fc in fc_Delete:
-        fc_path = os.path.join(localoutputws, fc)
-        if arcpy.Exists(fc_path):
-            arcpy.Delete_management(fc_path)
+    #Clean up workspace. The ops data, state intersect and buffer were all held in memory, so clearing the memory workspace releases them in one call.
+    arcpy.management.Delete(memoryws)
 except:
-    arcpy.AddError("Error Buffering Fire Perimeters and QAQCing Ops Data. Exiting.")
-    print("Error Buffering Fire Perimeters and QAQCing Ops Data. Exiting.")
+    log("Error Buffering Fire Perimeters and QAQCing Ops Data. Exiting.","error")
     report_error()
     sys.exit()
     
@@ -673,8 +641,7 @@ except:
 ##    sys.exit()
 
 try:
-    print("Writing Metadata to Output Feature Classes")
-    arcpy.AddMessage("Writing Metadata to Output Feature Classes")
+    log("Writing Metadata to Output Feature Classes")
     tgt_item_md = md.Metadata(QAQCd_OpsData)
     tgt_item_md.importMetadata(QAQCsourcemetadatapath)
     tgt_item_md.save()
@@ -683,10 +650,8 @@ try:
 ##    tgt_item_md.importMetadata(QAQCsourcemetadatapath)
 ##    tgt_item_md.save()
 except:
-    arcpy.AddError("Error Importing Metadata. Exiting.")
-    print("Error Importing Metadata. Exiting.")
+    log("Error Importing Metadata. Exiting.","error")
     report_error()
     sys.exit()
 
-print("Script Finished Running.")
-arcpy.AddMessage("Script Finished Running.")
+log("Script Finished Running.")
@@ -25,9 +25,15 @@ It will then attribute fireline engagement based on the user input fireline enga
 """
 #import libraries
 import arcpy, os, urllib, sys, requests, traceback
+import pandas as pd
 from zipfile import ZipFile
 from sys import argv
 from datetime import datetime, timezone
+# shapely is not part of the default ArcGIS Pro environment. When it is installed the buffer overlaps are counted from a shapely planar arrangement, otherwise with the intersect, union and count overlapping tools.
+try:
+    import shapely
+except ImportError:
+    shapely = None
 
 ###-Functions-###
 #Function to report any errors that occur while running in the message screen
@@ -44,6 +50,27 @@ def report_error():
     print(pymsg)
     print(msgs)
 
+#Function to split a fireline with the engagement rings. Returns (FirelineEngagement, geometry) pairs for the pieces that have length.
+#The part within the smaller rings is "Not Held", the part within the held ring is "Held" and the part outside of the larger rings is "Not Engaged".
+def split_engagement(line, notheld_ring, held_ring, outer_ring):
+    pieces = []
+    if notheld_ring is not None:
+        pieces.append(("Not Held", line.intersect(notheld_ring, 2)))
+    if held_ring is not None:
+        pieces.append(("Held", line.intersect(held_ring, 2)))
+    pieces.append(("Not Engaged", line if outer_ring is None else line.difference(outer_ring)))
+    return [(engagement, piece) for engagement, piece in pieces if piece is not None and piece.length > 0]
+
+#Function to split polygons into the faces of their planar arrangement with shapely. Returns (face, indices of the polygons covering it) pairs for every face covered by at least one polygon.
+def overlay_faces(polygons):
+    edges = shapely.get_parts(shapely.union_all(shapely.boundary(polygons)))
+    faces = shapely.get_parts(shapely.polygonize(edges))
+    face_idx, poly_idx = shapely.STRtree(polygons).query(shapely.point_on_surface(faces), predicate="within")
+    covering = {}
+    for i, j in zip(face_idx.tolist(), poly_idx.tolist()):
+        covering.setdefault(i, []).append(j)
+    return [(faces[i], sorted(covering[i])) for i in sorted(covering)]
+
 ###-Variables-###
 try:
     # Grab & Format system date & time
@@ -60,6 +87,21 @@ try:
     inputsws = os.path.join(local_root_fld,"Inputs","InputGeodatabase.gdb")
     rawdatastoragegdb = os.path.join(local_root_fld,"NIFC_DL_RawDataArchive","RawDLArchive.gdb")
     FLEsourcemetadatapath = os.path.join(local_root_fld,"Metadata","FLE_Metrics.xml")
+    memoryws = "memory" #In-memory workspace for intermediate data
+    #Intermediate data is written to memory. Only the two outputs are written to the output geodatabase.
+    PerimsToDiss = os.path.join(memoryws,"PerimsToDiss")
+    Perims = os.path.join(memoryws,"Perims")
+    Firelines_DissBuff = os.path.join(memoryws,"Firelines_DissBuff")
+    Line_DissBuffInt = os.path.join(memoryws,"Line_DissBuffInt")
+    Line_DissBuffInt_diss = os.path.join(memoryws,"Line_DissBuffInt_diss")
+    Line_DissBuffIntUnion = os.path.join(memoryws,"Line_DissBuffIntUnion")
+    Line_DissBuffIntUn_CntOvp = os.path.join(memoryws,"Line_DissBuffIntUn_CntOvp")
+    Line_CntOvp_Tbl = os.path.join(memoryws,"Line_CntOvp_Tbl")
+    Firelines_DissBuff_erase = os.path.join(memoryws,"Firelines_DissBuff_erase")
+    Line_CntOvlp_snglpt = os.path.join(memoryws,"Line_CntOvlp_snglpt")
+    Line_DissBuffErase_snglpt = os.path.join(memoryws,"Line_DissBuffErase_snglpt")
+    Line_Merge = os.path.join(memoryws,"Line_Merge")
+    FirePerims_RingBuffer = os.path.join(memoryws,"FirePerims_RingBuffer")
     
     #User Set Hardcoded parameters from ArcPro Tool
     QAQCed_Firelines = arcpy.GetParameter(0)#feature set type input parameter.
@@ -99,61 +141,48 @@ except:
 # This section is responsible for processing multiple perimeters into a single 'complex' feature.
 # It also applies the attributes from the largest perimeter (by geodesic area) to all other perimeters.
 try:
-    result = arcpy.GetCount_management(Perimeters)
-    count = int(result.getOutput(0))
+    #Count the perimeters with a cursor walk rather than the Get Count tool
+    with arcpy.da.SearchCursor(Perimeters,["OID@"]) as cursor:
+        count = sum(1 for row in cursor)
     # If there is more than one perimeter, they need to be dissolved into a complex.
     if count > 1:
         arcpy.AddMessage("Dissolving All Perimeters in the Complex and Taking Attribution From the Largest Perimeter")
         print("Dissolving All Perimeters in the Complex and Taking Attribution From the Largest Perimeter")
-        arcpy.management.CopyFeatures(Perimeters,"PerimsToDiss")
+        arcpy.management.CopyFeatures(Perimeters,PerimsToDiss)
         #if more than one perim, check if perim as
-        lstFields = arcpy.ListFields("PerimstoDiss")
-        lstfieldNames = [f.name for f in lstFields]
+        #The field names are read once and kept in a set for the checks below
+        lstFields = arcpy.ListFields(PerimsToDiss)
+        fieldNames = {f.name for f in lstFields}
         # If the 'attr_FireMgmtComplexity' field exists, handle the complex attribution logic. 
-        if "attr_FireMgmtComplexity" in lstfieldNames:
+        if "attr_FireMgmtComplexity" in fieldNames:
             #Team Cmplx Coding. If only one perim in the complex has a FireMgmtCmplx Team, it will be attributed to all. If several do, they will be concatenated.
-            arcpy.management.MakeFeatureLayer("PerimsToDiss","Perims_Teams","attr_FireMgmtComplexity IS NOT NULL")
-            resultteams = arcpy.GetCount_management("Perims_Teams")
-            count2 = int(resultteams.getOutput(0))
-            if count2 >= 1:
-                if count2 > 1:
-                    arcpy.analysis.Statistics("Perims_Teams","Perims_Teams_Statistics","attr_FireMgmtComplexity CONCATENATE",None,"; ")
-                if count2 == 1:
-                    arcpy.analysis.Statistics("Perims_Teams","Perims_Teams_Statistics","attr_FireMgmtComplexity FIRST",None)
-                arcpy.management.AddField("PerimsToDiss","LinkingField","SHORT")
-                arcpy.management.AddField("Perims_Teams_Statistics","LinkingField","SHORT")
-                arcpy.management.CalculateField("PerimsToDiss","LinkingField","1","PYTHON3","","TEXT","NO_ENFORCE_DOMAINS")
-                arcpy.management.CalculateField("Perims_Teams_Statistics","LinkingField","1","PYTHON3","","TEXT","NO_ENFORCE_DOMAINS")
-                if count2 > 1:
-                    arcpy.management.JoinField("PerimsToDiss","LinkingField","Perims_Teams_Statistics","LinkingField","CONCATENATE_attr_FireMgmtComplexity","NOT_USE_FM",None)
-                    arcpy.management.DeleteField("PerimsToDiss","attr_FireMgmtComplexity","DELETE_FIELDS")
-                    arcpy.management.AddField("PerimsToDiss","attr_FireMgmtComplexity","TEXT",None,None,None,"","NULLABLE","NON_REQUIRED","")
-                    arcpy.management.CalculateField("PerimsToDiss","attr_FireMgmtComplexity","!CONCATENATE_attr_FireMgmtComplexity!","PYTHON3","","TEXT","NO_ENFORCE_DOMAINS")
-                    arcpy.management.DeleteField("PerimsToDiss","LinkingField;CONCATENATE_attr_FireMgmtComplexity","DELETE_FIELDS")
-                if count2 == 1:
-                    arcpy.management.JoinField("PerimsToDiss","LinkingField","Perims_Teams_Statistics","LinkingField","FIRST_attr_FireMgmtComplexity","NOT_USE_FM",None)
-                    arcpy.management.DeleteField("PerimsToDiss","attr_FireMgmtComplexity","DELETE_FIELDS")
-                    arcpy.management.AddField("PerimsToDiss","attr_FireMgmtComplexity","TEXT",None,None,None,"","NULLABLE","NON_REQUIRED","")
-                    arcpy.management.CalculateField("PerimsToDiss","attr_FireMgmtComplexity","!FIRST_attr_FireMgmtComplexity!","PYTHON3","","TEXT","NO_ENFORCE_DOMAINS")
-                    arcpy.management.DeleteField("PerimsToDiss","LinkingField;FIRST_attr_FireMgmtComplexity","DELETE_FIELDS")
-                arcpy.management.Delete("Perims_Teams_Statistics","")
-        if "attr_FireMgmtComplexity" not in lstfieldNames:
-            arcpy.management.AddField("PerimsToDiss","attr_FireMgmtComplexity","TEXT",None,None,None,"","NULLABLE","NON_REQUIRED","")
+            #The teams are read and joined in Python, then written to every perimeter in one cursor pass.
+            with arcpy.da.SearchCursor(PerimsToDiss,["attr_FireMgmtComplexity"],"attr_FireMgmtComplexity IS NOT NULL") as cursor:
+                teams = [row[0] for row in cursor]
+            if teams:
+                teams_cmplx = "; ".join(teams)
+                #Replace the field with a default length text field if the concatenated teams do not fit in it
+                if len(teams_cmplx) > next(f.length for f in lstFields if f.name == "attr_FireMgmtComplexity"):
+                    arcpy.management.DeleteField(PerimsToDiss,"attr_FireMgmtComplexity","DELETE_FIELDS")
+                    arcpy.management.AddField(PerimsToDiss,"attr_FireMgmtComplexity","TEXT",None,None,None,"","NULLABLE","NON_REQUIRED","")
+                with arcpy.da.UpdateCursor(PerimsToDiss,["attr_FireMgmtComplexity"]) as cursor:
+                    for row in cursor:
+                        cursor.updateRow([teams_cmplx])
+        if "attr_FireMgmtComplexity" not in fieldNames:
+            arcpy.management.AddField(PerimsToDiss,"attr_FireMgmtComplexity","TEXT",None,None,None,"","NULLABLE","NON_REQUIRED","")
         #Make sure geodesic acreage was calculated correctly.
-        lstFields = arcpy.ListFields("PerimstoDiss")
-        lstfieldNames = [f.name for f in lstFields]
-        if "GoedesicAcreage" in lstfieldNames:
-            arcpy.management.DeleteField("PerimsToDiss","GeodesicAcreage","DELETE_FIELDS")
-        arcpy.management.AddField("PerimstoDiss","GeodesicAcreage","DOUBLE",None,None,None,"","NULLABLE","NON_REQUIRED","")
-        arcpy.management.CalculateGeometryAttributes("PerimstoDiss","GeodesicAcreage AREA_GEODESIC","","ACRES",None,"SAME_AS_INPUT")
-        arcpy.management.MakeFeatureLayer("PerimsToDiss","Perimeters_Lrgst","GeodesicAcreage = (SELECT MAX(GeodesicAcreage) FROM PerimsToDiss)")
-        arcpy.conversion.ExportFeatures("Perimeters_Lrgst","Perimeters_LrgstPerim")
-        arcpy.management.CalculateField("Perimeters_LrgstPerim","Joinfield","1")
-        arcpy.management.CalculateField("PerimsToDiss","Joinfield","1")
-        arcpy.management.DeleteField("PerimsToDiss","attr_IrwinID;attr_IncidentName","DELETE_FIELDS")
-        arcpy.management.JoinField("PerimsToDiss","Joinfield","Perimeters_LrgstPerim","Joinfield","attr_IncidentName;attr_IrwinID")
-        arcpy.analysis.PairwiseDissolve("PerimsToDiss","Perims","attr_IncidentName;attr_IrwinID;attr_FireMgmtComplexity",None,"MULTI_PART")
-        arcpy.management.CalculateField("Perims","attr_IncidentName",'!attr_IncidentName!+ " Complex"',"PYTHON3","","TEXT","NO_ENFORCE_DOMAINS")
+        if "GeodesicAcreage" in fieldNames:
+            arcpy.management.DeleteField(PerimsToDiss,"GeodesicAcreage","DELETE_FIELDS")
+        arcpy.management.AddField(PerimsToDiss,"GeodesicAcreage","DOUBLE",None,None,None,"","NULLABLE","NON_REQUIRED","")
+        arcpy.management.CalculateGeometryAttributes(PerimsToDiss,"GeodesicAcreage AREA_GEODESIC","","ACRES",None,"SAME_AS_INPUT")
+        #Find the largest perimeter in one cursor sweep and attribute its Incident Name and IRWIN ID to all perimeters in a second
+        with arcpy.da.SearchCursor(PerimsToDiss,["GeodesicAcreage","attr_IncidentName","attr_IrwinID"]) as cursor:
+            lrgst_perim = max(cursor, key=lambda row: row[0] or 0)
+        with arcpy.da.UpdateCursor(PerimsToDiss,["attr_IncidentName","attr_IrwinID"]) as cursor:
+            for row in cursor:
+                cursor.updateRow(lrgst_perim[1:])
+        arcpy.analysis.PairwiseDissolve(PerimsToDiss,Perims,"attr_IncidentName;attr_IrwinID;attr_FireMgmtComplexity",None,"MULTI_PART")
+        arcpy.management.CalculateField(Perims,"attr_IncidentName",'!attr_IncidentName!+ " Complex"',"PYTHON3","","TEXT","NO_ENFORCE_DOMAINS")
     # If only a single perimeter is provided, check for the 'attr_FireMgmtComplexity' field and act accordingly.
     elif count == 1:
         lstFields = arcpy.ListFields(Perimeters)
@@ -162,25 +191,16 @@ try:
             print("Fire Mgmt Cmplx Field Present")
         else:
             arcpy.management.AddField(Perimeters,"attr_FireMgmtComplexity","TEXT",None,None,None,"","NULLABLE","NON_REQUIRED","")
-        arcpy.management.CopyFeatures(Perimeters,"Perims")
+        arcpy.management.CopyFeatures(Perimeters,Perims)
     # If no perimeters are provided, report an error and exit the script.
     elif count == 0:
         arcpy.AddError("No Features Provided in Perimeter Feature Class... Exiting")
         print("No Features Provided in Perimeter Feature Class... Exiting")
         sys.exit()
-    fc_Delete = ["Perimeters_Lrgst","FLE_Output_Dateti_Statistics","Perimeters_LrgstPerim","PerimsToDiss"]
-    for fc in fc_Delete:
-        fc_path = os.path.join(localoutputws, fc)
-        if arcpy.Exists(fc_path):
-            arcpy.Delete_management(fc_path)
 except:
     arcpy.AddError("Error Dissolving Perimeters in the Complex... Exiting")
     print("Error Dissolving Perimeters in the Complex... Exiting")
-    fc_Delete = ["Perims","Perimeters_Lrgst","FLE_Output_Dateti_Statistics","Perimeters_LrgstPerim","PerimsToDiss"]
-    for fc in fc_Delete:
-        fc_path = os.path.join(localoutputws, fc)
-        if arcpy.Exists(fc_path):
-            arcpy.Delete_management(fc_path) 
+    arcpy.management.Delete(memoryws)
     report_error()
     sys.exit()
 
@@ -192,179 +212,180 @@ try:
     #Dissolve FL to remove duplicates and only keep the highest ranking treatment for areas with duplicate lines and multiple treatments
     # Add a field to the fireline output to hold engagement status (Held, Not Held, Not Engaged).
     arcpy.management.AddField(FLEngageOutput,"FirelineEngagement","TEXT",None,None,None,"","NULLABLE","NON_REQUIRED","")
-    # Use the Multiple Ring Buffer tool to create two buffers: one inside (negative distance) and one outside (positive distance) the fire perimeter.
+    # Use the Multiple Ring Buffer tool to create two geodesic buffers in memory: one inside (negative distance) and one outside (positive distance) the fire perimeter.
     # This will help identify areas that are held or not by the firelines.
-    arcpy.analysis.MultipleRingBuffer("Perims","FirePerims_RingBuffer",FirelineEngagmentBuffList,"Meters","RingBuffDist","NONE","FULL","GEODESIC")
-    #export only larger ring buffer as its own feature class. This will be used to erase the smaller ring buffer to create the "held" area.
-    arcpy.management.MakeFeatureLayer("FirePerims_RingBuffer","FirePerims_RingBuffer_100Layer","RingBuffDist = "+(str(FirelineEngagmentBuffer))+"")
-    arcpy.conversion.ExportFeatures("FirePerims_RingBuffer_100Layer","FirePerims_heldring")
-    #Take the smaller rings and erase the area from the exported larger subset to create held area.
-    arcpy.management.MakeFeatureLayer("FirePerims_RingBuffer","FirePerims_RingBuffer_-100lyr","RingBuffDist = -"+(str(FirelineEngagmentBuffer))+"")
-    arcpy.analysis.PairwiseErase("FirePerims_heldring","FirePerims_RingBuffer_-100lyr","FirePerimsHeldRing")
-    #Clip Ops data with small rings to ID "Not Held" fireline
-    arcpy.analysis.PairwiseClip(FLEngageOutput,"FirePerims_RingBuffer_-100lyr","OpsData_NotHeldClip")
-    #Clip Ops data with buffer area to ID  "Held" fireline
-    arcpy.analysis.PairwiseClip(FLEngageOutput,"FirePerimsHeldRing","OpsData_HeldClip")
-    #Erase the original ops data with all the rings to only show "not engaged"
-    arcpy.analysis.PairwiseErase(FLEngageOutput,"FirePerims_RingBuffer_100Layer","OpsData_NotEngaged")
-    #Calculate field to attribute fireline engagement
-    arcpy.management.CalculateField("OpsData_NotHeldClip","FirelineEngagement",'"Not Held"',"PYTHON3","","TEXT","NO_ENFORCE_DOMAINS")
-    arcpy.management.CalculateField("OpsData_HeldClip","FirelineEngagement",'"Held"',"PYTHON3","","TEXT","NO_ENFORCE_DOMAINS")
-    arcpy.management.CalculateField("OpsData_NotEngaged","FirelineEngagement",'"Not Engaged"',"PYTHON3","","TEXT","NO_ENFORCE_DOMAINS")
-    #Delete ops data so that name can be used for the merge output as well as other non-needed features.
-    arcpy.Delete_management(FLEngageOutput)
-    # Merge the clipped and erased features back into a single feature class with attributed engagement status.
-    arcpy.management.Merge("OpsData_NotHeldClip;OpsData_HeldClip;OpsData_NotEngaged",FLEngageOutput)
+    arcpy.analysis.MultipleRingBuffer(Perims,FirePerims_RingBuffer,FirelineEngagmentBuffList,"Meters","RingBuffDist","NONE","FULL","GEODESIC")
+    #Read the smaller (negative distance) and larger rings once as single geometries.
+    notheld_ring = None
+    outer_ring = None
+    with arcpy.da.SearchCursor(FirePerims_RingBuffer,["RingBuffDist","SHAPE@"]) as cursor:
+        for row in cursor:
+            if row[1] is None:
+                continue
+            if row[0] < 0:
+                notheld_ring = row[1] if notheld_ring is None else notheld_ring.union(row[1])
+            else:
+                outer_ring = row[1] if outer_ring is None else outer_ring.union(row[1])
+    #Project the rings to the firelines' spatial reference, with a datum transformation when the two use different datums.
+    ring_sr = arcpy.Describe(FirePerims_RingBuffer).spatialReference
+    lines_sr = arcpy.Describe(FLEngageOutput).spatialReference
+    if ring_sr.name != lines_sr.name:
+        transformations = arcpy.ListTransformations(ring_sr,lines_sr)
+        if transformations:
+            notheld_ring, outer_ring = [None if ring is None else ring.projectAs(lines_sr,transformations[0]) for ring in (notheld_ring,outer_ring)]
+        else:
+            notheld_ring, outer_ring = [None if ring is None else ring.projectAs(lines_sr) for ring in (notheld_ring,outer_ring)]
+    arcpy.management.Delete(FirePerims_RingBuffer)
+    #The larger ring with the smaller rings erased from it is the "held" area.
+    held_ring = outer_ring if notheld_ring is None or outer_ring is None else outer_ring.difference(notheld_ring)
+    #Split every fireline with the rings in one cursor pass rather than clipping and erasing the firelines three times and merging the results.
+    #The first piece of a line is written back to its row and any other pieces are inserted as new rows with the same attributes.
+    fields = ["SHAPE@","FirelineEngagement"]+[f.name for f in arcpy.ListFields(FLEngageOutput) if f.editable and f.type not in ("OID","Geometry") and f.name != "FirelineEngagement"]
+    extra_pieces = []
+    with arcpy.da.UpdateCursor(FLEngageOutput,fields) as cursor:
+        for row in cursor:
+            pieces = split_engagement(row[0],notheld_ring,held_ring,outer_ring) if row[0] is not None else []
+            if not pieces:
+                cursor.deleteRow()
+                continue
+            for engagement, piece in pieces[1:]:
+                extra_pieces.append([piece,engagement]+list(row[2:]))
+            row[1], row[0] = pieces[0]
+            cursor.updateRow(row)
+    with arcpy.da.InsertCursor(FLEngageOutput,fields) as cursor:
+        for row in extra_pieces:
+            cursor.insertRow(row)
     #Clean up processing data
-    fc_Delete = ["Perims","FirePerims_RingBuffer","FirePerims_heldring","FirePerimsHeldRing","OpsData_HeldClip","OpsData_NotEngaged","OpsData_NotHeldClip"]
-    for fc in fc_Delete:
-        fc_path = os.path.join(localoutputws, fc)
-        if arcpy.Exists(fc_path):
-            arcpy.Delete_management(fc_path)
+    arcpy.management.Delete(Perims)
 except:
     arcpy.AddError("Error Could NOT Attribute Fireline Engagement Attributes")
     print("Error Could NOT Attribute Fireline Engagement Attributes")
+    arcpy.management.Delete(memoryws)
     report_error()
     sys.exit()
 
 
 try:
-    # Dissolve the firelines based on the feature category to consolidate overlapping features.
-    arcpy.analysis.PairwiseDissolve(FLEngageOutput,"Firelines_Diss","FeatureCategory;FirelineEngagement",None,"MULTI_PART","")
-    # Add a new short integer field to hold a numeric value for the type of fireline based on the feature category.
-    arcpy.management.AddField("Firelines_Diss","LineTypeValue","SHORT",None,None,None,"","NULLABLE","NON_REQUIRED","")
-    arcpy.management.AddField("Firelines_Diss","EngagementValue","SHORT",None,None,None,"","NULLABLE","NON_REQUIRED","")
-    # Calculate the LineTypeValue field with a numeric ranking based on predefined categories.
-    arcpy.management.CalculateField(
-        in_table="Firelines_Diss",
-        field="LineTypeValue",
-        expression="Reclass(!FeatureCategory!)",
-        expression_type="PYTHON3",
-        code_block="""def Reclass(FeatureCategory):
-        if FeatureCategory =='Completed Road as Line':
-            return 7
-        elif FeatureCategory =='Road as Completed Line':
-            return 7
-        elif FeatureCategory =='Completed Dozer Line':
-            return 6
-        elif FeatureCategory =='Completed Hand Line':
-            return 5
-        elif FeatureCategory =='Completed Mixed Construction Line':
-            return 4
-        elif FeatureCategory =='Completed Fuel Break':
-            return 3
-        elif FeatureCategory =='Completed Burnout':
-            return 2
-        elif FeatureCategory =='Completed Plow Line':
-            return 1
-        elif FeatureCategory is None:
-            return None
-        else: 
-            return 1000""",
-        field_type="SHORT",
-        enforce_domains="NO_ENFORCE_DOMAINS")
-    arcpy.management.CalculateField(
-        in_table="Firelines_Diss",
-        field="EngagementValue",
-        expression="Reclass(!FirelineEngagement!)",
-        expression_type="PYTHON3",
-        code_block="""def Reclass(FirelineEngagement):
-        if FirelineEngagement =='Held':
-            return 3
-        elif FirelineEngagement =='Not Engaged':
-            return 2
-        elif FirelineEngagement =='Not Held':
-            return 1
-        elif FirelineEngagement is None:
-            return None
-        else: 
-            return 1000""",
-    field_type="SHORT",
-    enforce_domains="NO_ENFORCE_DOMAINS")
-    # Buffer the dissolved firelines to create a 50-meter buffer around each line.
-    arcpy.analysis.PairwiseBuffer("Firelines_Diss","Firelines_DissBuff", str(FirelineBuffer)+" Meters","NONE",None,"GEODESIC","0 DecimalDegrees")
-    # Intersect the buffered firelines to identify overlaps between different fireline types.
-    arcpy.analysis.PairwiseIntersect("Firelines_DissBuff","Line_DissBuffInt","ALL",None,"INPUT")
-    arcpy.management.RepairGeometry("Line_DissBuffInt","DELETE_NULL","ESRI")
-    # Dissolve the intersected buffered firelines again, this time including the newly calculated LineTypeValue.
-    arcpy.analysis.PairwiseDissolve("Line_DissBuffInt","Line_DissBuffInt_diss","FeatureCategory;LineTypeValue;FirelineEngagement;EngagementValue",None,"MULTI_PART","")
-    # Perform a union to combine all pieces of the buffered firelines, including overlaps and gaps.
-    arcpy.analysis.Union("Line_DissBuffInt_diss #","Line_DissBuffIntUnion","ALL",None,"GAPS")
-    # Count the overlapping features to determine the complexity of fireline intersections.
-    arcpy.analysis.CountOverlappingFeatures("Line_DissBuffIntUnion","Line_DissBuffIntUn_CntOvp",1,"Line_CntOvp_Tbl")
-    # Join the count and statistics back to the original features to include the overlap counts and stats.
-    arcpy.management.JoinField("Line_CntOvp_Tbl","ORIG_OID","Line_DissBuffIntUnion","OBJECTID","LineTypeValue;FeatureCategory;FirelineEngagement;EngagementValue","NOT_USE_FM",None)
-    arcpy.analysis.Statistics("Line_CntOvp_Tbl","Line_CntOvp_Stats_MxVlu","LineTypeValue MAX","OVERLAP_OID","")
-    arcpy.analysis.Statistics("Line_CntOvp_Tbl","Line_CntOvp_Stats_Sum","LineTypeValue SUM","OVERLAP_OID","")
-    arcpy.analysis.Statistics("Line_CntOvp_Tbl","Line_CntOvp_Stats_Concat","FeatureCategory CONCATENATE","OVERLAP_OID",", ")
-    arcpy.analysis.Statistics("Line_CntOvp_Tbl","Line_CntOvp_Stats_ValueConcat","LineTypeValue CONCATENATE","OVERLAP_OID",", ")
-    arcpy.analysis.Statistics("Line_CntOvp_Tbl","Line_CntOvp_EngVluMx","EngagementValue MAX","OVERLAP_OID","")
-    arcpy.management.JoinField("Line_DissBuffIntUn_CntOvp","OBJECTID","Line_CntOvp_Stats_MxVlu","OVERLAP_OID","MAX_LineTypeValue","NOT_USE_FM",None)
-    arcpy.management.JoinField("Line_DissBuffIntUn_CntOvp","OBJECTID","Line_CntOvp_Stats_Sum","OVERLAP_OID","SUM_LineTypeValue","NOT_USE_FM",None)
-    arcpy.management.JoinField("Line_DissBuffIntUn_CntOvp","OBJECTID","Line_CntOvp_Stats_Concat","OVERLAP_OID","CONCATENATE_FeatureCategory","NOT_USE_FM",None)
-    arcpy.management.JoinField("Line_DissBuffIntUn_CntOvp","OBJECTID","Line_CntOvp_Stats_ValueConcat","OVERLAP_OID","CONCATENATE_LineTypeValue","NOT_USE_FM",None)
-    arcpy.management.JoinField("Line_DissBuffIntUn_CntOvp","OBJECTID","Line_CntOvp_EngVluMx","OVERLAP_OID","MAX_EngagementValue","NOT_USE_FM",None)
-    # Erase the original buffer from the union of intersected buffers to define clear boundaries.
-    arcpy.analysis.PairwiseErase("Firelines_DissBuff","Line_DissBuffIntUn_CntOvp","Firelines_DissBuff_erase",None)
-    arcpy.management.RepairGeometry("Firelines_DissBuff_erase","DELETE_NULL","ESRI")
-    # Convert any multipart features to single parts for both the erased buffer and the count overlap features.
-    arcpy.management.MultipartToSinglepart("Line_DissBuffIntUn_CntOvp","Line_CntOvlp_snglpt")
-    arcpy.management.MultipartToSinglepart("Firelines_DissBuff_erase","Line_DissBuffErase_snglpt")
-    arcpy.management.DeleteField("Line_DissBuffErase_snglpt","BUFF_DIST; ORIG_FID","DELETE_FIELDS")
-    arcpy.management.DeleteField("Line_CntOvlp_snglpt","COUNT_FC; ORIG_FID","DELETE_FIELDS")
-    # Merge the single-part features back into a combined feature class.
-    arcpy.management.Merge("Line_CntOvlp_snglpt;Line_DissBuffErase_snglpt","Line_Merge")
+    # Buffer the firelines and dissolve the buffers based on the feature category and engagement to consolidate overlapping features.
+    #The dissolve is done by the buffer tool, so the dissolved lines are never written out and read back.
+    arcpy.analysis.PairwiseBuffer(FLEngageOutput,Firelines_DissBuff, str(FirelineBuffer)+" Meters","LIST","FeatureCategory;FirelineEngagement","GEODESIC","0 DecimalDegrees")
+    # Add new short integer fields to hold numeric values for the type of fireline based on the feature category and for the engagement.
+    arcpy.management.AddFields(Firelines_DissBuff,[["LineTypeValue","SHORT"],["EngagementValue","SHORT"]])
+    # Calculate the LineTypeValue and EngagementValue fields with numeric rankings based on predefined categories, with dictionary lookups in a single cursor pass. Unlisted values get 1000.
+    LineTypeValues = {
+        'Completed Road as Line': 7,
+        'Road as Completed Line': 7,
+        'Completed Dozer Line': 6,
+        'Completed Hand Line': 5,
+        'Completed Mixed Construction Line': 4,
+        'Completed Fuel Break': 3,
+        'Completed Burnout': 2,
+        'Completed Plow Line': 1,
+    }
+    EngagementValues = {
+        'Held': 3,
+        'Not Engaged': 2,
+        'Not Held': 1,
+    }
+    with arcpy.da.UpdateCursor(Firelines_DissBuff,["FeatureCategory","FirelineEngagement","LineTypeValue","EngagementValue"]) as cursor:
+        for row in cursor:
+            row[2] = None if row[0] is None else LineTypeValues.get(row[0], 1000)
+            row[3] = None if row[1] is None else EngagementValues.get(row[1], 1000)
+            cursor.updateRow(row)
+    if shapely is not None:
+        #Split the buffers into the faces of their planar arrangement and attribute each face from the buffers covering it in one pass.
+        #Faces covered by more than one buffer get the overlap count and statistics, and the rest keep the attributes of their buffer, as the intersect, union, count overlapping, erase and merge steps below do.
+        with arcpy.da.SearchCursor(Firelines_DissBuff,["SHAPE@WKB","FeatureCategory","LineTypeValue","FirelineEngagement","EngagementValue"]) as cursor:
+            buffers = [row for row in cursor if row[0] is not None]
+        arcpy.management.CreateFeatureclass(memoryws,"Line_Merge","POLYGON",spatial_reference=arcpy.Describe(Firelines_DissBuff).spatialReference)
+        arcpy.management.AddFields(Line_Merge,[["FeatureCategory","TEXT"],["LineTypeValue","SHORT"],["FirelineEngagement","TEXT"],["EngagementValue","SHORT"],["COUNT_","LONG"],["MAX_LineTypeValue","SHORT"],["SUM_LineTypeValue","DOUBLE"],["CONCATENATE_FeatureCategory","TEXT","",8000],["CONCATENATE_LineTypeValue","TEXT","",8000],["MAX_EngagementValue","SHORT"]])
+        with arcpy.da.InsertCursor(Line_Merge,["SHAPE@WKB","FeatureCategory","LineTypeValue","FirelineEngagement","EngagementValue","COUNT_","MAX_LineTypeValue","SUM_LineTypeValue","CONCATENATE_FeatureCategory","CONCATENATE_LineTypeValue","MAX_EngagementValue"]) as cursor:
+            for face, covering in overlay_faces([shapely.from_wkb(bytes(row[0])) for row in buffers]):
+                if len(covering) == 1:
+                    cursor.insertRow([shapely.to_wkb(face)]+list(buffers[covering[0]][1:])+[None]*6)
+                    continue
+                line_types = [buffers[i][2] for i in covering if buffers[i][2] is not None]
+                engagements = [buffers[i][4] for i in covering if buffers[i][4] is not None]
+                cursor.insertRow([shapely.to_wkb(face),None,None,None,None,len(covering),max(line_types,default=None),sum(line_types) if line_types else None,", ".join(buffers[i][1] for i in covering if buffers[i][1] is not None),", ".join(str(value) for value in line_types),max(engagements,default=None)])
+    else:
+        # Intersect the buffered firelines to identify overlaps between different fireline types.
+        arcpy.analysis.PairwiseIntersect(Firelines_DissBuff,Line_DissBuffInt,"ALL",None,"INPUT")
+        arcpy.management.RepairGeometry(Line_DissBuffInt,"DELETE_NULL","ESRI")
+        # Dissolve the intersected buffered firelines again, this time including the newly calculated LineTypeValue.
+        arcpy.analysis.PairwiseDissolve(Line_DissBuffInt,Line_DissBuffInt_diss,"FeatureCategory;LineTypeValue;FirelineEngagement;EngagementValue",None,"MULTI_PART","")
+        # Perform a union to combine all pieces of the buffered firelines, including overlaps and gaps.
+        arcpy.analysis.Union(Line_DissBuffInt_diss,Line_DissBuffIntUnion,"ALL",None,"GAPS")
+        # Count the overlapping features to determine the complexity of fireline intersections.
+        arcpy.analysis.CountOverlappingFeatures(Line_DissBuffIntUnion,Line_DissBuffIntUn_CntOvp,1,Line_CntOvp_Tbl)
+        # Join the count and statistics back to the original features to include the overlap counts and stats.
+        #The overlap table is joined to the union attributes and summarized by overlap in one pandas groupby, rather than with a Statistics table and JoinField per statistic.
+        with arcpy.da.SearchCursor(Line_CntOvp_Tbl,["OVERLAP_OID","ORIG_OID"]) as cursor:
+            overlaps = pd.DataFrame(list(cursor),columns=["OVERLAP_OID","ORIG_OID"])
+        with arcpy.da.SearchCursor(Line_DissBuffIntUnion,["OID@","LineTypeValue","FeatureCategory","EngagementValue"]) as cursor:
+            union_attrs = pd.DataFrame(list(cursor),columns=["ORIG_OID","LineTypeValue","FeatureCategory","EngagementValue"])
+        overlaps = overlaps.merge(union_attrs,on="ORIG_OID",how="left")
+        overlap_stats = overlaps.groupby("OVERLAP_OID").agg(
+            MAX_LineTypeValue=("LineTypeValue","max"),
+            SUM_LineTypeValue=("LineTypeValue","sum"),
+            CONCATENATE_FeatureCategory=("FeatureCategory",lambda values: ", ".join(values.dropna())),
+            CONCATENATE_LineTypeValue=("LineTypeValue",lambda values: ", ".join(str(int(value)) for value in values.dropna())),
+            MAX_EngagementValue=("EngagementValue","max"))
+        overlap_stats = overlap_stats.astype(object).where(overlap_stats.notna(),None)
+        overlap_stats = {row[0]: row[1:] for row in overlap_stats.itertuples(name=None)}
+        stats_fields = ["MAX_LineTypeValue","SUM_LineTypeValue","CONCATENATE_FeatureCategory","CONCATENATE_LineTypeValue","MAX_EngagementValue"]
+        arcpy.management.AddFields(Line_DissBuffIntUn_CntOvp,[["MAX_LineTypeValue","SHORT"],["SUM_LineTypeValue","DOUBLE"],["CONCATENATE_FeatureCategory","TEXT","",8000],["CONCATENATE_LineTypeValue","TEXT","",8000],["MAX_EngagementValue","SHORT"]])
+        with arcpy.da.UpdateCursor(Line_DissBuffIntUn_CntOvp,["OID@"]+stats_fields) as cursor:
+            for row in cursor:
+                if row[0] in overlap_stats:
+                    cursor.updateRow([row[0]]+list(overlap_stats[row[0]]))
+        # Erase the original buffer from the union of intersected buffers to define clear boundaries.
+        arcpy.analysis.PairwiseErase(Firelines_DissBuff,Line_DissBuffIntUn_CntOvp,Firelines_DissBuff_erase,None)
+        arcpy.management.RepairGeometry(Firelines_DissBuff_erase,"DELETE_NULL","ESRI")
+        # Convert any multipart features to single parts for both the erased buffer and the count overlap features.
+        arcpy.management.MultipartToSinglepart(Line_DissBuffIntUn_CntOvp,Line_CntOvlp_snglpt)
+        arcpy.management.MultipartToSinglepart(Firelines_DissBuff_erase,Line_DissBuffErase_snglpt)
+        #Only delete the fields the tools actually wrote. The dissolved buffers have no BUFF_DIST field.
+        for fc, dropfields in ((Line_DissBuffErase_snglpt,["BUFF_DIST","ORIG_FID"]),(Line_CntOvlp_snglpt,["COUNT_FC","ORIG_FID"])):
+            existing = [f.name for f in arcpy.ListFields(fc) if f.name in dropfields]
+            if existing:
+                arcpy.management.DeleteField(fc,existing,"DELETE_FIELDS")
+        # Merge the single-part features back into a combined feature class.
+        arcpy.management.Merge([Line_CntOvlp_snglpt,Line_DissBuffErase_snglpt],Line_Merge)
     # Add and calculate fields to store text representations of the line types and their codes.
-    arcpy.management.AddField("Line_Merge","LineType","TEXT",None,None,None,"","NULLABLE","NON_REQUIRED","")
-    arcpy.management.AddField("Line_Merge","LineTypeCodes","TEXT",None,None,None,"","NULLABLE","NON_REQUIRED","")
-    arcpy.management.MakeFeatureLayer("Line_Merge","Line_Merge_Layer","LineTypeValue IS NULL")
-    arcpy.management.CalculateField("Line_Merge_Layer","LineTypeCodes","!CONCATENATE_LineTypeValue!","PYTHON3","","TEXT","NO_ENFORCE_DOMAINS")
-    arcpy.management.CalculateField("Line_Merge_Layer","LineType","!CONCATENATE_FeatureCategory!","PYTHON3","","TEXT","NO_ENFORCE_DOMAINS")
-    arcpy.management.MakeFeatureLayer("Line_Merge","Line_Merge_Layer2","FeatureCategory IS NOT NULL")
-    arcpy.management.CalculateField("Line_Merge_Layer2","LineType","!FeatureCategory!","PYTHON3","","TEXT","NO_ENFORCE_DOMAINS")
-    arcpy.management.CalculateField("Line_Merge_Layer2","LineTypeCodes","!LineTypeValue!","PYTHON3","","TEXT","NO_ENFORCE_DOMAINS")
-    arcpy.management.MakeFeatureLayer("Line_Merge","Line_Merge_Layer3","EngagementValue IS NULL")
-    arcpy.management.CalculateField(
-        in_table="Line_Merge_Layer3",
-        field="FirelineEngagement",
-        expression="Reclass(!MAX_EngagementValue!)",
-        expression_type="PYTHON3",
-        code_block="""def Reclass(MAX_EngagementValue):
-        if MAX_EngagementValue == 3:
-            return 'Held'
-        elif MAX_EngagementValue == 2:
-            return 'Not Engaged'
-        elif MAX_EngagementValue == 1:
-            return 'Not Held'
-        elif MAX_EngagementValue is None:
-            return 'error'
-        else: 
-            return 'error1'""",
-        field_type="TEXT",
-        enforce_domains="NO_ENFORCE_DOMAINS"
-    )
-    arcpy.management.CalculateField("Line_Merge_Layer3","EngagementValue","!MAX_EngagementValue!","PYTHON3","","TEXT","NO_ENFORCE_DOMAINS")
-    arcpy.management.DeleteField("Line_Merge","CONCATENATE_FeatureCategory;CONCATENATE_LineTypeValue;FeatureCategory;LineTypeValue;MAX_EngagementValue","DELETE_FIELDS")
-    # Prepare the final layers for output by calculating fields where necessary.
-    arcpy.management.MakeFeatureLayer("Line_Merge","FnlLyr","MAX_LineTypeValue IS NULL")
-    arcpy.management.CalculateField("FnlLyr","SUM_LineTypeValue","!LineTypeCodes!","PYTHON3","","TEXT","NO_ENFORCE_DOMAINS")
-    arcpy.management.CalculateField("FnlLyr","MAX_LineTypeValue","!LineTypeCodes!","PYTHON3","","TEXT","NO_ENFORCE_DOMAINS")
-    arcpy.management.MakeFeatureLayer("Line_Merge","FnlLyr2","COUNT_ IS NULL")
-    arcpy.management.CalculateField("FnlLyr2","COUNT_","1","PYTHON3","","TEXT","NO_ENFORCE_DOMAINS")
-    arcpy.analysis.PairwiseDissolve("Line_Merge",IncidentName_BuffEnggmntLines_Datetime,"COUNT_;MAX_LineTypeValue;SUM_LineTypeValue;LineType;LineTypeCodes;FirelineEngagement",None,"MULTI_PART","")
-    fc_Delete = ["Line_Merge","Line_CntOvp_EngVluMx","Line_DissBuffErase_snglpt","Line_CntOvlp_snglpt","Firelines_Diss","Firelines_DissBuff_erase","Line_DissBuffIntUn_CntOvp","Line_DissBuffIntUnion","Line_DissBuffInt_diss","Line_DissBuffInt","Firelines_DissBuff","Line_CntOvp_Tbl","Line_CntOvp_Stats_MxVlu","Line_CntOvp_Stats_Sum","Line_CntOvp_Stats_Concat","Line_CntOvp_Stats_ValueConcat"]
-    for fc in fc_Delete:
-        fc_path = os.path.join(localoutputws, fc)
-        if arcpy.Exists(fc_path):
-            arcpy.Delete_management(fc_path) 
+    arcpy.management.AddFields(Line_Merge,[["LineType","TEXT"],["LineTypeCodes","TEXT"]])
+    #Overlap pieces get the engagement of their highest engagement value with a dictionary lookup
+    EngagementNames = {
+        3: 'Held',
+        2: 'Not Engaged',
+        1: 'Not Held',
+    }
+    #Attribute the line types, codes, engagement, and the final count and line type values of every piece in one cursor pass.
+    #Overlap pieces have no LineTypeValue and take the concatenated values, while single buffer pieces have no statistics and take their own values with a count of 1.
+    with arcpy.da.UpdateCursor(Line_Merge,["FeatureCategory","LineTypeValue","CONCATENATE_FeatureCategory","CONCATENATE_LineTypeValue","EngagementValue","MAX_EngagementValue","FirelineEngagement","MAX_LineTypeValue","SUM_LineTypeValue","COUNT_","LineType","LineTypeCodes"]) as cursor:
+        for row in cursor:
+            if row[1] is None:
+                row[10] = row[2]
+                row[11] = row[3]
+            if row[0] is not None:
+                row[10] = row[0]
+                row[11] = None if row[1] is None else str(row[1])
+            if row[4] is None:
+                row[6] = 'error' if row[5] is None else EngagementNames.get(row[5], 'error1')
+                row[4] = row[5]
+            if row[7] is None and row[11]:
+                row[7] = int(row[11])
+                row[8] = float(row[11])
+            if row[9] is None:
+                row[9] = 1
+            cursor.updateRow(row)
+    arcpy.management.DeleteField(Line_Merge,"CONCATENATE_FeatureCategory;CONCATENATE_LineTypeValue;FeatureCategory;LineTypeValue;MAX_EngagementValue","DELETE_FIELDS")
+    arcpy.analysis.PairwiseDissolve(Line_Merge,IncidentName_BuffEnggmntLines_Datetime,"COUNT_;MAX_LineTypeValue;SUM_LineTypeValue;LineType;LineTypeCodes;FirelineEngagement",None,"MULTI_PART","")
+    #Clean up processing data. All intermediate data was held in memory, so clearing the memory workspace releases it in one call.
+    arcpy.management.Delete(memoryws)
 except:
     arcpy.AddError("Error Overlapping Buffered Firelines... Exiting")
     print("Error")
-    fc_Delete = ["Line_CntOvp_EngVluMx","Line_Merge","Perims","Line_DissBuffErase_snglpt","Line_CntOvlp_snglpt","Firelines_Diss","Firelines_DissBuff_erase","Line_DissBuffIntUn_CntOvp","Line_DissBuffIntUnion","Line_DissBuffInt_diss","Line_DissBuffInt","Firelines_DissBuff","Line_CntOvp_Tbl","Line_CntOvp_Stats_MxVlu","Line_CntOvp_Stats_Sum","Line_CntOvp_Stats_Concat","Line_CntOvp_Stats_ValueConcat"]
-    for fc in fc_Delete:
-        fc_path = os.path.join(localoutputws, fc)
-        if arcpy.Exists(fc_path):
-            arcpy.Delete_management(fc_path) 
+    arcpy.management.Delete(memoryws)
     report_error()
     sys.exit()
 
@@ -1,4 +1,4 @@
-import requests, geopandas as gpd, pandas as pd, shapely, numpy as np, gdown, zipfile, os
+import requests, geopandas as gpd, pandas as pd, shapely, numpy as np, gdown, zipfile, os, pyogrio
 from scipy.spatial import KDTree
 from shapely import LineString
 from shapely.geometry import MultiPoint, LineString
@@ -93,21 +93,22 @@ class FLE_QAQC:
             if(not os.path.exists(gdb_nm)):
                 zip_ref.extractall(".")
         
-        gdf=gpd.read_file(gdb_nm,layer='EventLine',driver='OpenFileGDB',rows=1)
+        #the layer crs comes from the layer metadata, no features need to be read
+        crs=pyogrio.read_info(gdb_nm,layer='EventLine')['crs']
 
         if(not geo is None):
             if isinstance(geo,gpd.GeoDataFrame):
-                geo = (geo.to_crs(gdf.crs)).total_bounds
+                geo = (geo.to_crs(crs)).total_bounds
             elif isinstance(geo,gpd.GeoSeries):
-                geo = (geo.to_crs(gdf.crs)).total_bounds
+                geo = (geo.to_crs(crs)).total_bounds
             elif isinstance(geo,shapely.geometry.Polygon):
                 geo = geo.bounds
             else:
                 pass
 
-            gdf=gpd.read_file(gdb_nm,layer='EventLine',driver='OpenFileGDB',bbox=tuple(geo))
+            gdf=gpd.read_file(gdb_nm,layer='EventLine',engine='pyogrio',bbox=tuple(geo))
         else:
-            gdf=gpd.read_file(gdb_nm,layer='EventLine',driver='OpenFileGDB')
+            gdf=gpd.read_file(gdb_nm,layer='EventLine',engine='pyogrio')
 
         print('Read in',gdf.shape[0],'records...')
 